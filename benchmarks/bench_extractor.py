@@ -0,0 +1,131 @@
+"""
+Benchmark: product page extraction.
+
+Compares the previous BeautifulSoup("html.parser") extraction against
+project.services.pdp_parser over a corpus of product pages and checks both
+return the same fields on every page.
+Each implementation runs in its own process so peak RSS is comparable.
+
+The bundled fixtures follow the PDP markup of one layout each: available,
+discarded variant, shield, no seller block, USD price, no installments and
+variant pickers with a crossed-out previous price. --archive RUN_ID uses the
+real pages of a run recorded with HTML_ARCHIVE=1 instead (--limit caps them).
+
+    python benchmarks/bench_extractor.py [--fixtures DIR | --archive RUN_ID [--limit N]] [--rounds N]
+"""
+import argparse, glob, json, os, resource, subprocess, sys, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "pdp")
+KEYS = ("title", "price", "competitor", "price_in_installments", "image", "_status")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# REFERENCE: extraction as it was in first_scrapp / second_scrapp
+# ──────────────────────────────────────────────────────────────────────────────
+def legacy_parse(url, html, discard_phrase):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    msg_el = soup.find(class_="ui-pdp-shipping-message__text")
+    if msg_el and discard_phrase in msg_el.get_text(strip=True):
+        return {"title": "n/a", "price": "", "competitor": "n/a", "price_in_installments": "n/a",
+                "image": "n/a", "_url": url, "_status": "discarded"}
+    t = soup.find("h1", class_="ui-pdp-title")
+    precio_container = soup.find("div", {"class": "ui-pdp-price__second-line"})
+    p = precio_container.find("span", {"class": "andes-money-amount__fraction"}) if precio_container else None
+    c = soup.find("h2", class_="ui-seller-data-header__title")
+    q = soup.find("div", class_="ui-pdp-price__subtitles")
+    img = soup.find("img", class_="ui-pdp-image")
+    parsed = {
+        "title": (t.text.strip() if t else "n/a"),
+        "price": (p.text.strip() if p else ""),
+        "competitor": (c.text.strip() if c else "n/a"),
+        "price_in_installments": (q.text.strip() if q else "n/a"),
+        "image": (img["src"] if (img and img.get("src")) else "n/a"),
+        "_url": url,
+        "_status": "successed",
+    }
+    if parsed["title"] == "n/a":
+        parsed["_status"] = "failed"
+    return parsed
+
+def load_corpus(fixtures, archive=None, limit=None):
+    if archive:
+        from project.services.html_archive import ARCHIVE_DIR, read_index, read_blob
+        seen, corpus = set(), []
+        for entry in read_index(archive):
+            if entry["sha"] not in seen:
+                seen.add(entry["sha"])
+                corpus.append((entry["url"], read_blob(ARCHIVE_DIR, entry["sha"])))
+        if not corpus:
+            sys.exit(f"no archived pages for run {archive}")
+        return corpus[:limit] if limit else corpus
+    paths = sorted(glob.glob(os.path.join(fixtures, "*.html")))
+    if not paths:
+        sys.exit(f"no *.html fixtures in {fixtures}")
+    return [(os.path.basename(p), open(p, encoding="utf-8").read()) for p in paths]
+
+def get_impl(name):
+    from project.services.pdp_parser import parse_html, DISCARD_PHRASE
+    if name == "bs4":
+        return lambda url, html: legacy_parse(url, html, DISCARD_PHRASE)
+    return lambda url, html: parse_html(url, html)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CHILD: run one implementation and print a JSON line
+# ──────────────────────────────────────────────────────────────────────────────
+def run_child(impl, fixtures, rounds, archive=None, limit=None):
+    corpus = load_corpus(fixtures, archive, limit)
+    parse = get_impl(impl)
+    rows = {name: {k: v for k, v in parse(name, html).items() if k in KEYS} for name, html in corpus}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name, html in corpus:
+            parse(name, html)
+    elapsed = time.perf_counter() - start
+    pages = rounds * len(corpus)
+    print(json.dumps({
+        "impl": impl,
+        "pages": pages,
+        "pages_per_sec": pages / elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rows": rows,
+    }))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    ap.add_argument("--archive", help="run id of an HTML archive to take the pages from")
+    ap.add_argument("--limit", type=int, help="at most this many archived pages")
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--child", choices=["bs4", "fast"])
+    args = ap.parse_args()
+
+    if args.child:
+        run_child(args.child, args.fixtures, args.rounds, args.archive, args.limit)
+        return
+
+    results = {}
+    source = ["--archive", args.archive] + (["--limit", str(args.limit)] if args.limit else []) \
+        if args.archive else ["--fixtures", args.fixtures]
+    for impl in ("bs4", "fast"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", impl, "--rounds", str(args.rounds)] + source,
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[impl] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{'impl':<6} {'pages':>6} {'pages/sec':>10} {'peak RSS MB':>12}")
+    for impl, r in results.items():
+        print(f"{impl:<6} {r['pages']:>6} {r['pages_per_sec']:>10.1f} {r['peak_rss_mb']:>12.1f}")
+    speedup = results["fast"]["pages_per_sec"] / results["bs4"]["pages_per_sec"]
+    print(f"speedup: {speedup:.1f}x")
+
+    mismatches = [n for n in results["bs4"]["rows"] if results["bs4"]["rows"][n] != results["fast"]["rows"][n]]
+    if mismatches:
+        print(f"OUTPUT MISMATCH: {mismatches}")
+        sys.exit(1)
+    print(f"outputs match on all {len(results['bs4']['rows'])} pages")
+
+if __name__ == "__main__":
+    main()
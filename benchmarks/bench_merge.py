@@ -0,0 +1,136 @@
+"""
+Benchmark: merge of first-pass and rescue rows.
+
+Compares the previous pandas path (concat + sort + groupby last/sum + merge)
+against the streaming ScrapMerger in project.services.json_merge.
+Each implementation/size runs in its own process so peak RSS is comparable.
+
+    python benchmarks/bench_merge.py [--sizes 10000,100000,1000000]
+"""
+import argparse, json, os, random, resource, subprocess, sys, tempfile, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+CHECK_KEYS = ("catalog_link", "title", "price", "status", "timestamp", "api_cost_total")
+
+# ──────────────────────────────────────────────────────────────
+# DATA
+# ──────────────────────────────────────────────────────────────
+def generate(rows, workdir):
+    """Write `rows` rows: ~80% first pass (NDJSON), ~20% rescue stages (JSON)."""
+    rnd = random.Random(rows)
+    first = int(rows * 0.8)
+    scrap_path = os.path.join(workdir, "scrap_results.ndjson")
+    failed_path = os.path.join(workdir, "scrapping_failed_urls.json")
+    failed_urls = []
+    with open(scrap_path, "w", encoding="utf-8") as f:
+        for i in range(first):
+            status = "failed" if rnd.random() < 0.25 else rnd.choice(["successed"] * 9 + ["discarded"])
+            url = f"https://articulo.mercadolibre.com.ar/MLA-{1000000 + i}"
+            if status == "failed":
+                failed_urls.append(url)
+            f.write(json.dumps({
+                "title": f"Producto {i}" if status == "successed" else "n/a",
+                "price": f"{rnd.randint(1, 999)}.{rnd.randint(100, 999)}" if status == "successed" else "",
+                "competitor": "Vendedor", "price_in_installments": "12x $1.000", "image": "https://img",
+                "_url": url, "_timestamp": f"2025-01-01T10:{i // 60 % 60:02d}:{i % 60:02d}",
+                "_status": status, "_api_cost": rnd.choice(["30", "25", "n/a"]), "_run_id": "bench",
+            }) + "\n")
+    rescue = []
+    for n in range(rows - first):
+        url = failed_urls[n % len(failed_urls)] if failed_urls else f"extra-{n}"
+        rescue.append({
+            "title": f"Rescued {n}", "price": "1.000", "competitor": "Vendedor",
+            "price_in_installments": "n/a", "image": "n/a", "_url": url,
+            "_timestamp": f"2025-01-01T11:{n // 3600 % 60:02d}:{n // 60 % 60:02d}.{n % 60:02d}",
+            "_status": "successed" if n % 3 == 2 else "failed", "_api_cost": "45",
+            "retry_stage": "first_attempt", "failure_reason": None,
+        })
+    with open(failed_path, "w", encoding="utf-8") as f:
+        json.dump(rescue, f)
+    return scrap_path, failed_path
+
+# ──────────────────────────────────────────────────────────────
+# IMPLEMENTATIONS
+# ──────────────────────────────────────────────────────────────
+def legacy_merge(scrap_path, failed_path):
+    import pandas as pd
+    from project.services.json_merge import load_json_list
+    scrap_rows = [json.loads(l) for l in open(scrap_path, encoding="utf-8") if l.strip()]
+    failed_rows = load_json_list(failed_path)
+    df_scrap = pd.DataFrame(scrap_rows)
+    df_failed = pd.DataFrame(failed_rows)
+    df_all = df_scrap.copy() if df_failed.empty else pd.concat([df_scrap, df_failed], ignore_index=True)
+    df_all = df_all.sort_values("_timestamp")
+    df_all["_api_cost"] = pd.to_numeric(df_all.get("_api_cost", 0), errors="coerce").fillna(0)
+    last_records = df_all.groupby("_url").last().reset_index()
+    sum_costs = df_all.groupby("_url")["_api_cost"].sum().reset_index().rename(columns={"_api_cost": "_api_cost_total"})
+    merged_df = pd.merge(last_records, sum_costs, on="_url")
+    merged_df = merged_df.rename(columns={"_url": "catalog_link", "_timestamp": "timestamp",
+                                          "_status": "status", "_api_cost_total": "api_cost_total"})
+    return merged_df.to_dict(orient="records")
+
+def streaming_merge(scrap_path, failed_path):
+    from project.services.json_merge import ScrapMerger, load_json_list
+    from project.services.result_store import read_ndjson
+    merger = ScrapMerger()
+    for row in read_ndjson(scrap_path):
+        merger.add(row)
+    for row in load_json_list(failed_path):
+        merger.add(row)
+    return merger.records()
+
+def digest(records):
+    return sorted(tuple(str(r[k]) if k != "api_cost_total" else str(float(r[k])) for k in CHECK_KEYS)
+                  for r in records)
+
+# ──────────────────────────────────────────────────────────────
+# RUN
+# ──────────────────────────────────────────────────────────────
+def run_child(impl, scrap_path, failed_path):
+    fn = legacy_merge if impl == "pandas" else streaming_merge
+    # pay the imports before the clock starts
+    import project.services.json_merge
+    if impl == "pandas":
+        import pandas
+    start = time.perf_counter()
+    records = fn(scrap_path, failed_path)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "urls": len(records),
+        "digest": hash(tuple(digest(records))),
+    }))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--child", nargs=3, metavar=("IMPL", "SCRAP", "FAILED"))
+    args = ap.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    print(f"{'rows':>9} {'impl':<9} {'seconds':>8} {'peak RSS MB':>12} {'urls':>8}")
+    ok = True
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as workdir:
+            scrap_path, failed_path = generate(size, workdir)
+            out = {}
+            for impl in ("pandas", "streaming"):
+                res = subprocess.run([sys.executable, __file__, "--child", impl, scrap_path, failed_path],
+                                     check=True, capture_output=True, text=True, env={**os.environ, "PYTHONHASHSEED": "0"})
+                out[impl] = json.loads(res.stdout.strip().splitlines()[-1])
+                r = out[impl]
+                print(f"{size:>9} {impl:<9} {r['seconds']:>8.2f} {r['peak_rss_mb']:>12.1f} {r['urls']:>8}")
+            if out["pandas"]["digest"] != out["streaming"]["digest"]:
+                print(f"OUTPUT MISMATCH at {size} rows")
+                ok = False
+    if not ok:
+        sys.exit(1)
+    print("outputs match")
+
+if __name__ == "__main__":
+    main()
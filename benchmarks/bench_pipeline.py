@@ -0,0 +1,116 @@
+"""
+Benchmark: the whole scraping pipeline against the offline Scrapfly fake.
+
+Runs pipeline_scrapping.run_pipeline (credit plan, adaptive first pass,
+circuit breaker, rescue ladder, incremental merge) over generated catalog
+URLs served by project.services.fake_scrapfly, and reports URLs/sec,
+p50/p95 per-URL latency (first request to last response), credits per
+success and peak RSS. No credits are spent and nothing is written to the DB.
+Each scenario runs in its own process so peak RSS is comparable.
+
+    python benchmarks/bench_pipeline.py [--urls 300] [--latency-ms 50] [--scenarios clean,shielded]
+"""
+import argparse, json, os, resource, subprocess, sys, tempfile, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "pdp")
+
+# fake client parameters per scenario
+SCENARIOS = {
+    "clean": dict(shield_rate=0.02, timeout_rate=0.01),
+    "flaky": dict(shield_rate=0.10, timeout_rate=0.05),
+    "shielded": dict(shield_rate=0.45, timeout_rate=0.05),
+}
+
+# ──────────────────────────────────────────────────────────────
+# RUN (child process)
+# ──────────────────────────────────────────────────────────────
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def run(scenario, n_urls, latency_ms, credits):
+    # pacing knobs off: measure the pipeline, not the politeness delays
+    os.environ.setdefault("THINK_TIME_MIN", "0")
+    os.environ.setdefault("THINK_TIME_MAX", "0")
+    os.environ.setdefault("BREAKER_COOLDOWN", str(latency_ms / 1000 * 5))
+    os.environ["HTML_ARCHIVE"] = "0"
+    import asyncio
+    from project.services import second_scrapp, pipeline_scrapping
+    from project.services.fake_scrapfly import FakeScrapflyClient
+    from project.services.scrapfly_client import use_client
+    from project.services.credit_plan import plan_credits, CreditLedger
+    from project.services.json_merge import ScrapMerger
+    from project.services.result_store import NdjsonWriter, new_run_id
+    from project.services.run_context import RunContext
+    from project.services.budget import remaining_credits
+    second_scrapp.RESCUE_PAUSE = 0
+
+    fake = FakeScrapflyClient(FIXTURES_DIR, latency_s=latency_ms / 1000, credits=credits, **SCENARIOS[scenario])
+    use_client(fake)
+    urls = [f"https://articulo.mercadolibre.com.ar/MLA-{1400000000 + i}-producto-_JM" for i in range(n_urls)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        plan = plan_credits(urls, {}, remaining_credits(), rows=[])
+        ledger = CreditLedger(plan)
+        merger = ScrapMerger()
+        run_id = new_run_id()
+        with NdjsonWriter(os.path.join(workdir, "scrap_results.ndjson")) as writer, \
+                RunContext(run_id, {}, ledger) as ctx:
+            asyncio.run(pipeline_scrapping.run_pipeline(ctx, plan.urls, plan.deferred, writer, merger))
+        records = merger.records()
+        wall = time.perf_counter() - start
+
+    statuses = {}
+    for r in records:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    latencies = [end - first for first, end, _ in fake.spans.values()]
+    successes = statuses.get("successed", 0) + statuses.get("discarded", 0)
+    return {
+        "scenario": scenario,
+        "urls": n_urls,
+        "wall_s": round(wall, 2),
+        "urls_per_s": round(n_urls / wall, 1),
+        "p50_s": round(percentile(latencies, 0.50), 3),
+        "p95_s": round(percentile(latencies, 0.95), 3),
+        "requests": fake.requests,
+        "credits": fake.spent,
+        "credits_per_success": round(fake.spent / successes, 1) if successes else None,
+        "statuses": statuses,
+        "outcomes": fake.outcomes,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+# ──────────────────────────────────────────────────────────────
+# MAIN
+# ──────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--urls", type=int, default=300)
+    ap.add_argument("--latency-ms", type=float, default=50)
+    ap.add_argument("--credits", type=int, default=1_000_000)
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(run(args.child, args.urls, args.latency_ms, args.credits)))
+        return
+
+    print(f"{'scenario':<10} {'urls/s':>7} {'p50 s':>7} {'p95 s':>7} {'requests':>9} "
+          f"{'cr/success':>11} {'peak MB':>8}  statuses")
+    for scenario in args.scenarios.split(","):
+        res = subprocess.run(
+            [sys.executable, __file__, "--child", scenario, "--urls", str(args.urls),
+             "--latency-ms", str(args.latency_ms), "--credits", str(args.credits)],
+            cwd=ROOT, capture_output=True, text=True, check=True)
+        r = json.loads(res.stdout.strip().splitlines()[-1])
+        print(f"{r['scenario']:<10} {r['urls_per_s']:>7} {r['p50_s']:>7} {r['p95_s']:>7} {r['requests']:>9} "
+              f"{r['credits_per_success']!s:>11} {r['peak_rss_mb']:>8}  {r['statuses']}")
+
+if __name__ == "__main__":
+    main()
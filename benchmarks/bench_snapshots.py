@@ -0,0 +1,102 @@
+"""
+Benchmark: month-scale price history from Parquet run snapshots vs the JSON
+run files.
+
+Writes --days daily runs of --urls merged records with
+project.services.snapshots, the same runs as merged_results-style JSON
+(indent=2, as the run files used to be), and times a one-URL and a
+one-seller history over all of them: snapshots.history() (column projection
++ predicate pushdown) against loading every JSON file and filtering.
+
+    python benchmarks/bench_snapshots.py [--urls 20000] [--days 30]
+"""
+import argparse, json, os, random, sys, tempfile, time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from project.services.snapshots import write_snapshot, history
+
+SELLERS = [f"Tienda {i}" for i in range(200)]
+
+# ──────────────────────────────────────────────────────────────
+# DATA
+# ──────────────────────────────────────────────────────────────
+def make_run(n_urls, day, rnd):
+    ts = day.strftime("%Y-%m-%dT03:%M:%S")
+    records = []
+    for i in range(n_urls):
+        price = 10_000 + (i * 7919) % 900_000 + rnd.randrange(0, 5) * 1000
+        records.append({
+            "title": f"Producto {i}",
+            "price": f"{price:,}".replace(",", "."),
+            "competitor": SELLERS[i % len(SELLERS)],
+            "price_in_installments": f"Mismo precio en 12 cuotas de ${price // 12:,}".replace(",", "."),
+            "image": f"https://http2.mlstatic.com/D_NQ_NP_{i}-F.webp",
+            "catalog_link": f"https://articulo.mercadolibre.com.ar/MLA-{1400000000 + i}-producto-_JM",
+            "timestamp": ts,
+            "status": "successed",
+            "failure_reason": None,
+            "api_cost_total": 30,
+        })
+    return records
+
+# ──────────────────────────────────────────────────────────────
+# MAIN
+# ──────────────────────────────────────────────────────────────
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--urls", type=int, default=20_000)
+    ap.add_argument("--days", type=int, default=30)
+    args = ap.parse_args()
+    rnd = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        parquet_root = os.path.join(workdir, "snapshots")
+        json_root = os.path.join(workdir, "json")
+        os.makedirs(json_root)
+        write_s = 0.0
+        start_day = datetime.now() - timedelta(days=args.days - 1)
+        for d in range(args.days):
+            day = start_day + timedelta(days=d)
+            run_id = f"{day.strftime('%Y%m%d')}T030000-{d:06x}"
+            records = make_run(args.urls, day, rnd)
+            t = time.perf_counter()
+            write_snapshot(run_id, records, parquet_root)
+            write_s += time.perf_counter() - t
+            with open(os.path.join(json_root, f"{run_id}.json"), "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+
+        url = f"https://articulo.mercadolibre.com.ar/MLA-{1400000000 + args.urls // 2}-producto-_JM"
+        seller = SELLERS[7]
+
+        def from_json(key, value):
+            out = []
+            for name in sorted(os.listdir(json_root)):
+                with open(os.path.join(json_root, name), "r", encoding="utf-8") as f:
+                    out += [r for r in json.load(f) if r[key] == value]
+            return out
+
+        timings = {}
+        for label, fn in (
+            ("parquet url", lambda: history(url=url, days=args.days + 1, root=parquet_root)),
+            ("parquet seller", lambda: history(seller=seller, days=args.days + 1, root=parquet_root)),
+            ("json url", lambda: from_json("catalog_link", url)),
+            ("json seller", lambda: from_json("competitor", seller)),
+        ):
+            t = time.perf_counter()
+            rows = len(fn())
+            timings[label] = (time.perf_counter() - t, rows)
+
+        print(f"{args.days} runs x {args.urls} URLs")
+        print(f"size: parquet {dir_size(parquet_root) / 2**20:.1f} MB, json {dir_size(json_root) / 2**20:.1f} MB; "
+              f"snapshot write {write_s / args.days:.2f} s/run")
+        for label, (secs, rows) in timings.items():
+            print(f"{label:<16} {secs:>7.3f} s  {rows} rows")
+
+if __name__ == "__main__":
+    main()
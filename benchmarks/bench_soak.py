@@ -0,0 +1,100 @@
+"""
+Soak test: many back-to-back simulated runs in one long-lived process, like
+the Flask / Cloud Run worker, asserting that memory and threads stay flat.
+
+Each run goes through what scrapping() does between planning and the DB load,
+against the offline Scrapfly fake: credit plan and ledger, RunContext, the
+pipeline (first pass + rescue ladder + merge), run metrics and summary,
+fan-out and typed price normalization. After every run the RSS (after a
+gc pass) and the live thread count are sampled; the test fails when the RSS
+grows more than --max-growth-mb past the --warmup runs or threads pile up.
+
+    python benchmarks/bench_soak.py [--runs 40] [--urls 300] [--warmup 5] [--max-growth-mb 8]
+"""
+import argparse, gc, logging, os, sys, tempfile, threading, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "pdp")
+
+# pacing knobs off and no archive: measure state, not politeness delays
+os.environ.setdefault("THINK_TIME_MIN", "0")
+os.environ.setdefault("THINK_TIME_MAX", "0")
+os.environ.setdefault("BREAKER_COOLDOWN", "0.2")
+os.environ["HTML_ARCHIVE"] = "0"
+
+def rss_mb():
+    """Current (not peak) resident set size."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+# ──────────────────────────────────────────────────────────────
+# RUN
+# ──────────────────────────────────────────────────────────────
+def simulated_run(n_urls, workdir):
+    import asyncio
+    from project.services import pipeline_scrapping
+    from project.services.budget import remaining_credits
+    from project.services.canonical import dedupe, fan_out
+    from project.services.credit_plan import plan_credits, CreditLedger
+    from project.services.json_merge import ScrapMerger
+    from project.services.metrics import start_run, write_summary
+    from project.services.prices import normalize_records
+    from project.services.result_store import NdjsonWriter, new_run_id
+    from project.services.run_context import RunContext
+
+    links = [f"https://articulo.mercadolibre.com.ar/MLA-{1400000000 + i}-producto-_JM" for i in range(n_urls)]
+    urls, groups = dedupe(links)
+    run_id = new_run_id()
+    plan = plan_credits(urls, {}, remaining_credits(), rows=[])
+    ledger = CreditLedger(plan)
+    metrics = start_run(run_id)
+    merger = ScrapMerger()
+    with NdjsonWriter(os.path.join(workdir, "scrap_results.ndjson")) as writer, \
+            RunContext(run_id, {}, ledger, None, metrics) as ctx:
+        asyncio.run(pipeline_scrapping.run_pipeline(ctx, plan.urls, plan.deferred, writer, merger))
+    write_summary(metrics, os.path.join(workdir, "run_summary.json"))
+    return len(normalize_records(fan_out(merger.records(), groups)))
+
+# ──────────────────────────────────────────────────────────────
+# MAIN
+# ──────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=40)
+    ap.add_argument("--urls", type=int, default=300)
+    ap.add_argument("--latency-ms", type=float, default=5)
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--max-growth-mb", type=float, default=8)
+    args = ap.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    from project.services import second_scrapp
+    from project.services.fake_scrapfly import FakeScrapflyClient
+    from project.services.scrapfly_client import use_client
+    second_scrapp.RESCUE_PAUSE = 0
+    # one fake for the whole process, like the one Scrapfly account behind every run
+    use_client(FakeScrapflyClient(FIXTURES_DIR, latency_s=args.latency_ms / 1000, shield_rate=0.1, timeout_rate=0.03))
+
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for i in range(args.runs):
+            start = time.perf_counter()
+            records = simulated_run(args.urls, workdir)
+            gc.collect()
+            samples.append((rss_mb(), threading.active_count()))
+            print(f"run {i + 1:>3}  {records} records  {time.perf_counter() - start:5.2f} s  "
+                  f"rss {samples[-1][0]:6.1f} MB  threads {samples[-1][1]}")
+
+    base_rss, base_threads = samples[min(args.warmup, len(samples)) - 1]
+    growth = max(rss for rss, _ in samples[args.warmup:] or samples) - base_rss
+    threads = max(t for _, t in samples[args.warmup:] or samples)
+    print(f"RSS growth after warmup: {growth:+.1f} MB (max {args.max_growth_mb}), "
+          f"threads {base_threads} -> {threads}")
+    if growth > args.max_growth_mb or threads > base_threads:
+        print("soak FAILED")
+        sys.exit(1)
+    print("soak OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: cold start of the web entry point.
+
+Imports `main` in a fresh interpreter with -X importtime, prints the total
+import time and the slowest top-level packages, and fails when the scraping
+stack leaks into startup or the import time goes over --max-ms.
+
+    python benchmarks/bench_startup.py [--runs 5] [--top 10] [--max-ms 0]
+"""
+import argparse, json, os, statistics, subprocess, sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# must only be imported when a scraping job runs
+DEFERRED = (
+    "scrapfly", "bs4", "pandas", "numpy", "sqlalchemy", "google.cloud.sql.connector",
+    "project.database.db_manager", "project.services.pipeline_scrapping",
+)
+
+def import_profile():
+    """Return ({module: cumulative_us}, total_us, loaded_deferred) for `import main`."""
+    code = f"import json, sys, main; print(json.dumps([m for m in {DEFERRED!r} if m in sys.modules]))"
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cum_us, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        # main itself and what main imports directly
+        if depth == 0 and name == "main" or depth == 1:
+            cumulative[name.strip()] = int(cum_us)
+    total = cumulative.get("main", 0)
+    return cumulative, total, json.loads(res.stdout.strip().splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--max-ms", type=float, default=0, help="fail above this median import time (0 = off)")
+    args = ap.parse_args()
+
+    totals, profile, leaked = [], {}, []
+    for _ in range(args.runs):
+        profile, total, leaked = import_profile()
+        totals.append(total / 1000)
+    median = statistics.median(totals)
+
+    print(f"import main: median {median:.1f} ms over {args.runs} runs (min {min(totals):.1f}, max {max(totals):.1f})")
+    print(f"{'module':<40} {'cumulative ms':>14}")
+    for name, us in sorted(profile.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{name:<40} {us / 1000:>14.1f}")
+
+    failed = False
+    if leaked:
+        print(f"FAIL: scraping stack imported at startup: {leaked}")
+        failed = True
+    if args.max_ms and median > args.max_ms:
+        print(f"FAIL: startup {median:.1f} ms > budget {args.max_ms} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("startup OK")
+
+if __name__ == "__main__":
+    main()
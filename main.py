@@ -1,9 +1,10 @@
 from flask import Flask
-from project.services.webhook import scrapping_event 
+from project.services.webhook import scrapping_event, metrics_event
 
 def create_app():
     app = Flask(__name__)
     app.register_blueprint(scrapping_event)
+    app.register_blueprint(metrics_event)
     return app
 
 app = create_app()
@@ -1,55 +1,344 @@
-from sqlalchemy import create_engine, text
-from google.cloud.sql.connector import Connector
-from project.settings.config import INSTANCE_DB, USER_DB, PASSWORD_DB, NAME_DB,  MELI_SCHMA
+from sqlalchemy import create_engine, text, bindparam
+from project.settings.config import (
+    INSTANCE_DB, USER_DB, PASSWORD_DB, NAME_DB,  MELI_SCHMA, LOAD_MODE,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT, DB_REFRESH_STRATEGY, URL_PAGE_SIZE,
+)
+from project.services.prices import PRICE_FIELDS, normalize_records
 from project.utils.logger import logger
+from datetime import datetime, timedelta
+import atexit, threading, time
+
+BATCH_SIZE = 500
+# typed price columns (services/prices.py), added to both tables by ensure_columns()
+PRICE_COLUMNS = {
+    "price_cents": "BIGINT NULL",
+    "installments_count": "SMALLINT NULL",
+    "installment_cents": "BIGINT NULL",
+    "interest_free": "TINYINT(1) NULL",
+    "currency": "CHAR(3) NULL",
+}
+# last time a link was scraped, stamped on every load (unchanged rows keep their timestamp),
+# and the fingerprint of the stored row (services/diff.py)
+SCRAPE_COLUMNS = {"last_scraped_at": "DATETIME NULL", "fingerprint": "CHAR(16) NULL"}
 
 ##!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
 ##CAMBIAR ESQUEMAS FIJOS A PARAMETROS 
 ##!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
 
+# ──────────────────────────────────────────────────────────────────────────────
+# CONNECTION: one Cloud SQL connector and one engine per process, created on
+# first use and released by dispose()
+# ──────────────────────────────────────────────────────────────────────────────
+_lock = threading.RLock()
+_connector = None
+_engine = None
+
+def get_connector():
+    global _connector
+    with _lock:
+        if _connector is None:
+            from google.cloud.sql.connector import Connector
+            _connector = Connector(refresh_strategy=DB_REFRESH_STRATEGY)
+        return _connector
+
 def getconn():
-    connector = Connector() 
-    return connector.connect(
+    start = time.perf_counter()
+    conn = get_connector().connect(
         INSTANCE_DB,
         "pymysql",
         user=USER_DB,
         password=PASSWORD_DB,
         db=NAME_DB,
-    )   
-
-engine = create_engine(
-        "mysql+pymysql://",
-        creator=getconn,
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=2,
     )
+    logger.info(f"DB connection opened in {(time.perf_counter() - start) * 1000:.0f} ms.")
+    return conn
+
+def get_engine():
+    global _engine
+    with _lock:
+        if _engine is None:
+            _engine = create_engine(
+                "mysql+pymysql://",
+                creator=getconn,
+                pool_pre_ping=True,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_timeout=DB_POOL_TIMEOUT,
+            )
+        return _engine
+
+def dispose():
+    """Close pooled connections and the connector (its refresh threads too)."""
+    global _engine, _connector
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        if _connector is not None:
+            _connector.close()
+            _connector = None
+
+atexit.register(dispose)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# QUERIES
+# ──────────────────────────────────────────────────────────────────────────────
+def _url_filters(shard=None):
+    """WHERE clauses and params of iter_urls' filters, on product_catalog_sync aliased as p."""
+    clauses, params = [], {}
+    if shard is not None:
+        # same split in every reader: CRC32 of the link, modulo the shard count
+        clauses.append("MOD(CRC32(p.catalog_link), :shards) = :shard")
+        params.update(shard=shard[0], shards=shard[1])
+    return clauses, params
+
+def iter_urls(batch_size=URL_PAGE_SIZE, shard=None):
+    """
+    Stream the distinct catalog links of product_catalog_sync in pages of
+    batch_size, keyset-paginated on catalog_link: each page is a short
+    indexed query on a pooled connection, so the first page is ready right
+    away and nothing holds a cursor open while the pages are consumed.
+    shard (k, n) keeps only the links with CRC32(catalog_link) % n == k,
+    pushed down to SQL. Which of them are due is up to scheduler.schedule.
+    """
+    clauses, params = _url_filters(shard)
+    where = "".join(f" AND {c}" for c in clauses)
+    page_query = text(f"""
+        SELECT DISTINCT p.catalog_link FROM {NAME_DB}.product_catalog_sync p
+        WHERE p.catalog_link IS NOT NULL AND p.catalog_link > :after{where}
+        ORDER BY p.catalog_link
+        LIMIT {int(batch_size)}
+    """)
+    after, total = "", 0
+    while True:
+        with get_engine().connect() as conn:
+            page = [row[0] for row in conn.execute(page_query, {**params, "after": after})]
+        if not page:
+            break
+        total += len(page)
+        yield page
+        if len(page) < batch_size:
+            break
+        after = page[-1]
+    logger.info(f"URL's ready to scrapp: {total}")
+
+def get_urls(**filters):
+    """Every catalog link (see iter_urls for the filters) as one list."""
+    logger.info("Extracting Catalog urls.")
+    return [url for page in iter_urls(**filters) for url in page]
 
-def get_urls():
-    with engine.begin() as conn:
-        logger.info("Extracting Catalog urls.")
-        result = conn.execute(
-            text(f"""
-                SELECT catalog_link FROM {NAME_DB}.product_catalog_sync
-                WHERE catalog_link is not null;
-            """)
+def get_change_stats(days):
+    """
+    Per catalog_link: its price or seller changes over the last `days`, how
+    many of them were discarded, its first history row, and the last time
+    the link was scraped (last_scraped_at, or the row timestamp for rows
+    loaded before that column existed).
+    A change is a successed/discarded history row whose price or seller
+    differs from the previous successed/discarded row of the link: the first
+    insert and the failed rows (and so the failed -> recovered flips with
+    the same price) are not changes.
+    """
+    stats = {}
+    with get_engine().begin() as conn:
+        ensure_history_table(conn)
+        ensure_columns(conn, "scrapped_competence")
+        history = conn.execute(text(f"""
+            SELECT catalog_link,
+                   SUM(CASE WHEN is_change THEN 1 ELSE 0 END) AS changes,
+                   SUM(CASE WHEN is_change AND status = 'discarded' THEN 1 ELSE 0 END) AS discarded,
+                   MIN(timestamp) AS first_seen
+            FROM (
+                SELECT catalog_link, status, timestamp,
+                       timestamp >= :since AND prev_status IS NOT NULL
+                       AND NOT (price_cents <=> prev_price AND competitor <=> prev_competitor) AS is_change
+                FROM (
+                    SELECT catalog_link, status, timestamp, price_cents, competitor,
+                           LAG(status) OVER w AS prev_status,
+                           LAG(price_cents) OVER w AS prev_price,
+                           LAG(competitor) OVER w AS prev_competitor
+                    FROM {MELI_SCHMA}.scrapped_competence_history
+                    WHERE status IN ('successed', 'discarded')
+                    WINDOW w AS (PARTITION BY catalog_link ORDER BY timestamp, id)
+                ) ordered
+            ) h
+            GROUP BY catalog_link
+        """), {"since": datetime.now() - timedelta(days=days)})
+        for row in history.mappings():
+            stats[row["catalog_link"]] = {
+                "changes": int(row["changes"]),
+                "discarded": int(row["discarded"] or 0),
+                "first_seen": row["first_seen"],
+                "last_scraped": None,
+            }
+        current = conn.execute(text(f"""
+            SELECT catalog_link, COALESCE(last_scraped_at, timestamp) AS last_scraped
+            FROM {MELI_SCHMA}.scrapped_competence
+        """))
+        for row in current.mappings():
+            stats.setdefault(row["catalog_link"], {"changes": 0, "discarded": 0, "first_seen": None})
+            stats[row["catalog_link"]]["last_scraped"] = row["last_scraped"]
+    return stats
+
+
+def _batches(rows, size=BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def _columns(fields):
+    return ", ".join(fields), ", ".join(f":{f}" for f in fields)
+
+def ensure_columns(conn, table):
+    """Add the typed price columns (and SCRAPE_COLUMNS on scrapped_competence) missing from MELI_SCHMA.table."""
+    existing = {row[0] for row in conn.execute(text("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table
+    """), {"schema": MELI_SCHMA, "table": table})}
+    columns = {**PRICE_COLUMNS, **(SCRAPE_COLUMNS if table == "scrapped_competence" else {})}
+    for column, ddl in columns.items():
+        if column not in existing:
+            logger.info(f"Adding column {column} to {MELI_SCHMA}.{table}.")
+            conn.execute(text(f"ALTER TABLE {MELI_SCHMA}.{table} ADD COLUMN {column} {ddl}"))
+
+def ensure_history_table(conn):
+    """Compact history: one row per catalog_link each time its price, seller or status changes."""
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {MELI_SCHMA}.scrapped_competence_history (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            catalog_link VARCHAR(768) NOT NULL,
+            price VARCHAR(32),
+            competitor VARCHAR(255),
+            status VARCHAR(32),
+            timestamp DATETIME,
+            price_cents BIGINT NULL,
+            installments_count SMALLINT NULL,
+            installment_cents BIGINT NULL,
+            interest_free TINYINT(1) NULL,
+            currency CHAR(3) NULL,
+            INDEX ix_history_link_ts (catalog_link(255), timestamp)
         )
-        dataraw = [dict(row).get('catalog_link') for row in result.mappings()]
-        if dataraw:
-            logger.info(f"URL's ready to scrapp: {len(dataraw)}")
-            return dataraw
-        else:
-            return []
-        
+    """))
+    ensure_columns(conn, "scrapped_competence_history")
+
+
+def get_state(links=None):
+    """catalog_link -> stored price, price_cents, competitor and status; every row when links is None."""
+    table_name = f"{MELI_SCHMA}.scrapped_competence"
+    state = {}
+    with get_engine().begin() as conn:
+        ensure_columns(conn, "scrapped_competence")
+        if links is None:
+            rows = conn.execute(text(f"SELECT catalog_link, price, price_cents, competitor, status FROM {table_name}"))
+            return {row["catalog_link"]: dict(row) for row in rows.mappings()}
+        select_query = text(f"""
+            SELECT catalog_link, price, price_cents, competitor, status FROM {table_name}
+            WHERE catalog_link IN :links
+        """).bindparams(bindparam("links", expanding=True))
+        for batch in _batches(links):
+            for row in conn.execute(select_query, {"links": batch}).mappings():
+                state[row["catalog_link"]] = dict(row)
+    return state
+
 
+def get_fingerprints(links):
+    """catalog_link -> stored fingerprint, for the given links that have one."""
+    select_query = text(f"""
+        SELECT catalog_link, fingerprint FROM {MELI_SCHMA}.scrapped_competence
+        WHERE catalog_link IN :links AND fingerprint IS NOT NULL
+    """).bindparams(bindparam("links", expanding=True))
+    fingerprints = {}
+    with get_engine().begin() as conn:
+        ensure_columns(conn, "scrapped_competence")
+        for batch in _batches(links, BATCH_SIZE * 4):
+            fingerprints.update(tuple(row) for row in conn.execute(select_query, {"links": batch}))
+    return fingerprints
 
-def load_scrap(result_list):
+
+def load_scrap(result_list, mode=LOAD_MODE, changes=None, complete=True):
+    """
+    Load merged records into scrapped_competence.
+    mode="upsert" (default) writes only the new and changed rows of the
+    diff (services/diff.py); mode="truncate" keeps the old TRUNCATE + full
+    insert behaviour, but only when the records cover the whole catalog
+    (complete): a run the scheduler or the credit plan cut short is upserted
+    so the links it did not scrape are kept. Without a precomputed changeset
+    the typed price columns are computed for the whole batch and the diff is
+    run here; a given one must come from these normalized records (diff
+    gives each its fingerprint). Returns the changeset.
+    """
+    from project.services.diff import diff
+    if changes is None:
+        result_list = normalize_records(result_list)
+        changes = diff(result_list)
+    if mode == "truncate" and not complete:
+        logger.warning("LOAD_MODE=truncate on a run that does not cover every catalog link: "
+                       "loading with upsert so the links not scraped are kept.")
+        mode = "upsert"
+    if mode == "truncate":
+        truncate_load(result_list)
+    else:
+        upsert_load(changes)
+    return changes
+
+
+LOAD_FIELDS = ("title", "price", "competitor", "price_in_installments", "image",
+               "catalog_link", "timestamp", "status", "api_cost_total", "fingerprint") + PRICE_FIELDS
+HISTORY_FIELDS = ("catalog_link", "price", "competitor", "status", "timestamp") + PRICE_FIELDS
+
+def upsert_load(changes):
+    """
+    Incremental load of a changeset, in a single transaction so readers keep
+    seeing the previous state until it commits: new rows are inserted,
+    changed rows updated, and both appended to scrapped_competence_history.
+    Unchanged rows only get their last_scraped_at stamped, a batch per
+    statement, and their fingerprint when they were stored without one.
+    """
+    table_name = f"{MELI_SCHMA}.scrapped_competence"
+    history_name = f"{MELI_SCHMA}.scrapped_competence_history"
+
+    with get_engine().begin() as conn:
+        ensure_columns(conn, "scrapped_competence")
+        ensure_history_table(conn)
+        logger.info(f"{table_name}: {len(changes.new)} nuevos, {len(changes.changed)} modificados, "
+                    f"{changes.unchanged} sin cambios.")
+
+        columns, values = _columns(LOAD_FIELDS)
+        insert_query = text(f"INSERT INTO {table_name} ({columns}, last_scraped_at) VALUES ({values}, :timestamp)")
+        assignments = ", ".join(f"{f} = :{f}" for f in LOAD_FIELDS if f != "catalog_link")
+        update_query = text(f"""
+            UPDATE {table_name} SET {assignments}, last_scraped_at = :timestamp WHERE catalog_link = :catalog_link
+        """)
+        stamp_query = text(f"""
+            UPDATE {table_name} SET last_scraped_at = :scraped_at WHERE catalog_link IN :links
+        """).bindparams(bindparam("links", expanding=True))
+        fingerprint_query = text(f"UPDATE {table_name} SET fingerprint = :fingerprint WHERE catalog_link = :catalog_link")
+        columns, values = _columns(HISTORY_FIELDS)
+        history_query = text(f"INSERT INTO {history_name} ({columns}) VALUES ({values})")
+        for batch in _batches(changes.new):
+            conn.execute(insert_query, batch)
+        for batch in _batches(changes.changed):
+            conn.execute(update_query, batch)
+        for batch in _batches(sorted(changes.seen.items())):
+            scraped_at = max((ts for _, ts in batch if ts), default=None) or datetime.now()
+            conn.execute(stamp_query, {"scraped_at": scraped_at, "links": [link for link, _ in batch]})
+        missing = [{"catalog_link": link, "fingerprint": fp} for link, fp in changes.missing.items()]
+        for batch in _batches(missing):
+            conn.execute(fingerprint_query, batch)
+        for batch in _batches(changes.rows()):
+            conn.execute(history_query, batch)
+        logger.info("Carga completada con éxito.")
+
+
+def truncate_load(result_list):
     """
+    Full reload: TRUNCATE + bulk insert of every row.
     """
     # Nombre de la tabla destino
     table_name = f"{MELI_SCHMA}.scrapped_competence"
 
-    with engine.begin() as conn:
+    with get_engine().begin() as conn:
+        ensure_columns(conn, "scrapped_competence")
+
         # 1. Truncate explícito
         logger.info(f"Limpiando la tabla {table_name}...")
         conn.execute(text(f"TRUNCATE TABLE {table_name}"))
@@ -57,14 +346,42 @@ def load_scrap(result_list):
         # 2. Insert masivo (Bulk Insert)
         # Usamos nombres de parámetros que coincidan exactamente con las llaves de tus dicts
         logger.info(f"Insertando {len(result_list)} registros.")
-        insert_query = text(f"""
-            INSERT INTO {table_name} (
-                title, price, competitor, price_in_installments, 
-                image, catalog_link, timestamp, status, api_cost_total
-            ) VALUES (
-                :title, :price, :competitor, :price_in_installments, 
-                :image, :catalog_link, :timestamp, :status, :api_cost_total
-            )
-        """)
+        columns, values = _columns(LOAD_FIELDS)
+        insert_query = text(f"INSERT INTO {table_name} ({columns}, last_scraped_at) VALUES ({values}, :timestamp)")
         conn.execute(insert_query, result_list)
-        logger.info("Carga completada con éxito.")
\ No newline at end of file
+        logger.info("Carga completada con éxito.")
+
+
+def backfill_prices(batch_size=BATCH_SIZE * 10):
+    """
+    Fill the typed price columns of rows stored before they existed, in both
+    scrapped_competence and its history, with the batch normalizer.
+    Returns the number of rows updated per table.
+    """
+    updated = {}
+    with get_engine().begin() as conn:
+        ensure_columns(conn, "scrapped_competence")
+        ensure_history_table(conn)
+    # history rows have no installments text
+    for table, key, plan in (("scrapped_competence", "catalog_link", "price_in_installments"),
+                             ("scrapped_competence_history", "id", "NULL")):
+        select_query = text(f"""
+            SELECT {key}, price, {plan} AS price_in_installments FROM {MELI_SCHMA}.{table}
+            WHERE price_cents IS NULL AND price IS NOT NULL AND price <> '' AND {key} > :after
+            ORDER BY {key} LIMIT {batch_size}
+        """)
+        assignments = ", ".join(f"{f} = :{f}" for f in PRICE_FIELDS)
+        update_query = text(f"UPDATE {MELI_SCHMA}.{table} SET {assignments} WHERE {key} = :{key}")
+        after, count = "" if key == "catalog_link" else 0, 0
+        while True:
+            with get_engine().begin() as conn:
+                rows = [dict(r) for r in conn.execute(select_query, {"after": after}).mappings()]
+                if not rows:
+                    break
+                typed = [r for r in normalize_records(rows) if r["price_cents"] is not None]
+                for batch in _batches(typed):
+                    conn.execute(update_query, batch)
+            after, count = rows[-1][key], count + len(typed)
+        logger.info(f"{MELI_SCHMA}.{table}: typed prices filled on {count} rows.")
+        updated[table] = count
+    return updated
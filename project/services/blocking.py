@@ -0,0 +1,142 @@
+from project.settings.config import (
+    BREAKER_THRESHOLD, BREAKER_WINDOW, BREAKER_MIN_SAMPLES, BREAKER_COOLDOWN, BREAKER_MAX_TRIPS,
+)
+from project.utils.logger import logger
+from collections import deque
+import asyncio, time
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+NOT_FOUND_STATUS = (404, 410)
+
+# reasons that count as "the site is pushing back" for the breaker
+BLOCK_REASONS = ("shield", "captcha", "timeout")
+# reasons not worth escalating: a heavier config will not bring the page back
+# (or there is nothing left to spend on it)
+FINAL_REASONS = ("not_found", "circuit_open", "budget")
+# rows written without a request reaching Scrapfly
+NOT_SENT_REASONS = ("circuit_open", "budget")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLASSIFICATION (pages are classified by pdp_parser.classify_page)
+# ──────────────────────────────────────────────────────────────────────────────
+def classify_error(e):
+    """Reason for an exception raised by the Scrapfly client."""
+    code = str(getattr(e, "code", "") or "").upper()
+    if isinstance(e, (asyncio.TimeoutError, TimeoutError)) or "TIMEOUT" in code:
+        return "timeout"
+    api_response = getattr(e, "api_response", None)
+    if getattr(api_response, "upstream_status_code", None) in NOT_FOUND_STATUS:
+        return "not_found"
+    if "::ASP::" in code or "CAPTCHA" in code:
+        return "shield"
+    return "error"
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE: run-level circuit breaker
+# ──────────────────────────────────────────────────────────────────────────────
+class CircuitBreaker:
+    """
+    Stops dispatching while the site is blocking us.
+    closed    - requests go out; the share of BLOCK_REASONS over the last
+                `window` outcomes is tracked
+    open      - block rate went over `threshold`: nobody is dispatched until
+                the cooldown ends (doubled on every consecutive trip)
+    half_open - a single probe goes out; a clean result closes the breaker,
+                another block opens it again
+    After `max_trips` consecutive trips the breaker gives up: wait() returns
+    False and callers write the row as failed with reason "circuit_open".
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, window=BREAKER_WINDOW, min_samples=BREAKER_MIN_SAMPLES,
+                 cooldown=BREAKER_COOLDOWN, max_trips=BREAKER_MAX_TRIPS):
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.state = "closed"
+        self.trips = 0           # consecutive trips, reset when a probe passes
+        self.total_trips = 0
+        self.paused_s = 0.0
+        self._outcomes = deque(maxlen=window)
+        self._open_until = 0.0
+        self._probing = False
+        self._cond = asyncio.Condition()
+
+    @property
+    def exhausted(self):
+        return self.max_trips > 0 and self.trips > self.max_trips
+
+    @property
+    def block_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    async def wait(self):
+        """Wait until a request may be dispatched; False once the breaker gave up."""
+        async with self._cond:
+            while True:
+                if self.exhausted:
+                    return False
+                if self.state == "closed":
+                    return True
+                if self.state == "open":
+                    delay = self._open_until - time.monotonic()
+                    if delay > 0:
+                        started = time.monotonic()
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), timeout=delay)
+                        except asyncio.TimeoutError:
+                            pass
+                        self.paused_s += time.monotonic() - started
+                        continue
+                    self.state = "half_open"
+                    self._probing = False
+                if self.state == "half_open" and not self._probing:
+                    self._probing = True
+                    logger.info("Circuit breaker half-open: sending one probe.")
+                    return True
+                await self._cond.wait()
+
+    async def record(self, reason):
+        """Feed the outcome of a dispatched request (failure reason, None when it worked)."""
+        blocked = reason in BLOCK_REASONS
+        async with self._cond:
+            if self.state == "half_open" and self._probing:
+                self._probing = False
+                if blocked:
+                    self._trip()
+                else:
+                    logger.info("Circuit breaker closed: probe went through.")
+                    self.state = "closed"
+                    self.trips = 0
+                    self._outcomes.clear()
+            elif self.state == "closed":
+                self._outcomes.append(blocked)
+                if len(self._outcomes) >= self.min_samples and self.block_rate >= self.threshold:
+                    self._trip()
+            self._cond.notify_all()
+
+    def _trip(self):
+        self.trips += 1
+        self.total_trips += 1
+        self.state = "open"
+        if self.exhausted:
+            logger.error(f"Circuit breaker gave up after {self.trips - 1} consecutive trips: "
+                         f"remaining URLs are not dispatched.")
+            return
+        pause = self.cooldown * 2 ** (self.trips - 1)
+        self._open_until = time.monotonic() + pause
+        logger.warning(f"Circuit breaker open: block rate {self.block_rate:.0%}, pausing {pause:.0f}s "
+                       f"(trip {self.trips}/{self.max_trips}).")
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "block_rate": round(self.block_rate, 3),
+            "trips": self.total_trips,
+            "paused_s": round(self.paused_s, 1),
+            "gave_up": self.exhausted,
+        }
@@ -1,10 +1,18 @@
-import requests
-from project.settings.config import SCRAP_KEY
+from project.services.scrapfly_client import get_account
+from project.utils.logger import logger
+
+def remaining_credits():
+    """Scrape credits left in the subscription, None when the account endpoint fails."""
+    try:
+        return get_account().get("subscription").get("usage").get("scrape").get("remaining")
+    except Exception:
+        logger.warning("Could not read the Scrapfly account, planning without a credit cap.")
+        return None
+
 def remain_budget():
-    url = f"https://api.scrapfly.io/account?key={SCRAP_KEY}"
-    response = requests.get(url)
-    credist_left = response.json().get("subscription").get("usage").get("scrape").get("remaining")
-    subscription_started_at = response.json().get("subscription").get("period").get("start")
-    subscription_ended_at = response.json().get("subscription").get("period").get("end")
+    account = get_account()
+    credist_left = account.get("subscription").get("usage").get("scrape").get("remaining")
+    subscription_started_at = account.get("subscription").get("period").get("start")
+    subscription_ended_at = account.get("subscription").get("period").get("end")
     data = f"Scrapping Finalizado\ncreditos restantes: {credist_left}\nfecha inicio de subscripcion: {subscription_started_at}\nfecha fin de subscripcion: {subscription_ended_at}"
     return data,credist_left
@@ -0,0 +1,68 @@
+from project.utils.logger import logger
+from urllib.parse import urlsplit, urlunsplit
+import re
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+# catalog product (/p/MLA123), user product (/up/MLAU123) and item (MLA-123-slug-_JM) pages
+PRODUCT_ID = re.compile(r"/(?:p|up)/(MLAU?\d+)", re.IGNORECASE)
+ITEM_ID = re.compile(r"(MLA)-?(\d{6,})", re.IGNORECASE)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def item_id(url):
+    """Mercado Libre product/item id of a link ("MLA123..."), None when there is none."""
+    path = urlsplit(url.strip()).path
+    found = PRODUCT_ID.search(path)
+    if found:
+        return found.group(1).upper()
+    found = ITEM_ID.search(path)
+    if found:
+        return f"{found.group(1).upper()}{found.group(2)}"
+    return None
+
+def canonical_url(url):
+    """Link without query string (tracking, variant filters) nor fragment, lowercase host."""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower() or "https", parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+def dedupe(links):
+    """
+    Group catalog links that point to the same item.
+    Returns (targets, groups): one canonical URL per item to scrape, in first
+    appearance order, and target -> [catalog links] for the fan-out.
+    """
+    by_key, groups = {}, {}
+    for link in links:
+        key = item_id(link) or canonical_url(link)
+        target = by_key.get(key)
+        if target is None:
+            target = by_key[key] = canonical_url(link)
+            groups[target] = []
+        groups[target].append(link)
+    saved = len(links) - len(groups)
+    if saved:
+        logger.info(f"Dedup: {len(links)} catalog links -> {len(groups)} unique items ({saved} requests saved).")
+    return list(groups), groups
+
+def fan_out(records, groups):
+    """Copy every merged record to each catalog link of its target."""
+    out = []
+    for record in records:
+        links = groups.get(record["catalog_link"]) or [record["catalog_link"]]
+        for link in links:
+            out.append({**record, "catalog_link": link})
+    return out
+
+def covers(records, groups):
+    """True when records hold every catalog link of groups (a full catalog run)."""
+    links = {record["catalog_link"] for record in records}
+    return all(link in links for group in groups.values() for link in group)
+
+def saved_requests(groups):
+    return sum(len(links) - 1 for links in groups.values())
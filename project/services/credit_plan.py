@@ -0,0 +1,215 @@
+from project.settings.config import CREDIT_RESERVE, CREDIT_DEFAULT_COST
+from project.services.fetch_tiers import TIERS
+from project.services.result_store import read_ndjson
+from project.services.jobs import JOBS_DIR
+from project.services.blocking import NOT_SENT_REASONS
+from project.utils.logger import logger
+import os, glob
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PATHS / CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(__file__)
+RESULTS_NDJSON = os.path.join(BASE_DIR, "../database/scrap_results.ndjson")
+WORKED_STATUS = ("successed", "discarded")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def to_credits(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def history_rows(paths=None):
+    """Rows of the shared results file and of every job directory still on disk."""
+    if paths is None:
+        paths = [RESULTS_NDJSON] + sorted(glob.glob(os.path.join(JOBS_DIR, "*", "scrap_results.ndjson")))
+    for path in paths:
+        yield from read_ndjson(path)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# COST MODEL: credits and success rate per stage, from recorded _api_cost
+# ──────────────────────────────────────────────────────────────────────────────
+class CostModel:
+    """
+    Average credits and success rate per stage (first pass + rescue ladder),
+    plus the average first-pass cost of every URL seen before. Stages
+    without history cost CREDIT_DEFAULT_COST and always succeed.
+    """
+
+    def __init__(self, default_cost=CREDIT_DEFAULT_COST):
+        self.default_cost = default_cost
+        self._stages = {}   # stage -> [credits, attempts, worked]
+        self._urls = {}     # url -> [credits, attempts] on the first pass
+
+    def add(self, row):
+        if row.get("_status") == "deferred" or row.get("failure_reason") in NOT_SENT_REASONS:
+            return
+        cost = to_credits(row.get("_api_cost"))
+        if cost is None:
+            return
+        stage = row.get("retry_stage") or "first_pass"
+        stats = self._stages.setdefault(stage, [0.0, 0, 0])
+        stats[0] += cost
+        stats[1] += 1
+        stats[2] += row.get("_status") in WORKED_STATUS
+        if stage == "first_pass":
+            url = self._urls.setdefault(row["_url"], [0.0, 0])
+            url[0] += cost
+            url[1] += 1
+
+    @classmethod
+    def from_rows(cls, rows):
+        model = cls()
+        for row in rows:
+            model.add(row)
+        return model
+
+    def stage_cost(self, stage):
+        stats = self._stages.get(stage)
+        return stats[0] / stats[1] if stats and stats[1] else self.default_cost
+
+    def success_rate(self, stage):
+        stats = self._stages.get(stage)
+        return stats[2] / stats[1] if stats and stats[1] else 1.0
+
+    def first_pass_cost(self, url):
+        stats = self._urls.get(url)
+        return stats[0] / stats[1] if stats else self.stage_cost("first_pass")
+
+    def ladder(self, start=1, reach=1.0):
+        """Expected credits per ladder stage for a URL entering TIERS[start] with probability reach."""
+        planned = {}
+        for stage in TIERS[max(1, start):]:
+            planned[stage] = reach * self.stage_cost(stage)
+            reach *= 1 - self.success_rate(stage)
+        return planned
+
+    def expected(self, url, tier=0):
+        """Expected credits per stage for one URL starting at TIERS[tier]."""
+        if tier > 0:
+            return self.ladder(tier)
+        return {"first_pass": self.first_pass_cost(url),
+                **self.ladder(1, 1 - self.success_rate("first_pass"))}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PLAN
+# ──────────────────────────────────────────────────────────────────────────────
+class CreditPlan:
+    """URLs that fit the budget, in dispatch order, and the credits planned per stage."""
+
+    def __init__(self, urls, deferred, skipped, planned, remaining, budget, model):
+        self.urls = urls            # first pass, by priority
+        self.deferred = deferred    # {url: tier}, by priority
+        self.skipped = skipped      # left for the next run
+        self.planned = planned      # stage -> credits
+        self.remaining = remaining
+        self.budget = budget        # None = no cap
+        self.model = model
+
+    @property
+    def rescue_planned(self):
+        return sum(v for k, v in self.planned.items() if k != "first_pass")
+
+
+def plan_credits(urls, deferred, remaining, rows=None, reserve=CREDIT_RESERVE):
+    """
+    Walk urls, then the known-hard deferred ({url: tier}), each in the
+    scheduler's priority order, and keep the ones whose expected credits
+    (first pass + expected rescue) fit remaining - reserve.
+    With remaining=None nothing is capped and the plan is only reported.
+    """
+    model = CostModel.from_rows(history_rows() if rows is None else rows)
+    budget = None if remaining is None else max(0.0, float(remaining) - reserve)
+
+    candidates = [(url, 0) for url in urls] + list(deferred.items())
+
+    kept, deferred_kept, skipped = [], {}, []
+    planned = dict.fromkeys(TIERS, 0.0)
+    total = 0.0
+    for url, tier in candidates:
+        expected = model.expected(url, tier)
+        cost = sum(expected.values())
+        if budget is not None and total + cost > budget:
+            skipped.append(url)
+            continue
+        total += cost
+        for stage, credits in expected.items():
+            planned[stage] += credits
+        if tier:
+            deferred_kept[url] = tier
+        else:
+            kept.append(url)
+
+    plan = CreditPlan(kept, deferred_kept, skipped, planned, remaining, budget, model)
+    logger.info(f"Credit plan: {len(kept) + len(deferred_kept)} URLs, ~{total:.0f} credits "
+                f"(first pass {planned['first_pass']:.0f}, rescue {plan.rescue_planned:.0f}) "
+                f"of {'unknown' if remaining is None else remaining} remaining.")
+    if skipped:
+        logger.warning(f"Credit plan: {len(skipped)} URLs do not fit the budget and are left for the next run.")
+    return plan
+
+# ──────────────────────────────────────────────────────────────────────────────
+# LEDGER: actual spend against the plan
+# ──────────────────────────────────────────────────────────────────────────────
+class CreditLedger:
+    """
+    Credits actually spent per stage. Every request reserves its expected
+    cost before it is sent and charge() swaps the reservation for the real
+    cost, so requests in flight count against the budget too. The first pass
+    stops when it would eat into the credits planned for the rescue; the
+    rescue stops at the budget.
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.spent = dict.fromkeys(TIERS, 0.0)
+        self._pending = dict.fromkeys(TIERS, 0.0)
+
+    def reserve(self, stage):
+        """Book the expected cost of one request at stage; False when it does not fit."""
+        estimate = self.plan.model.stage_cost(stage)
+        budget = self.plan.budget
+        if budget is not None:
+            if stage == "first_pass":
+                used, limit = self.spent[stage] + self._pending[stage], budget - self.plan.rescue_planned
+            else:
+                used, limit = self.total + sum(self._pending.values()), budget
+            if used + estimate > limit:
+                return False
+        self._pending[stage] += estimate
+        return True
+
+    def release(self, stage):
+        """Drop the reservation of a request that was not sent after all."""
+        self._pending[stage] = max(0.0, self._pending[stage] - self.plan.model.stage_cost(stage))
+
+    def charge(self, stage, cost):
+        """Replace the reservation made for stage with the credits actually spent."""
+        self._pending[stage] = max(0.0, self._pending[stage] - self.plan.model.stage_cost(stage))
+        self.spent[stage] += to_credits(cost) or 0.0
+
+    @property
+    def total(self):
+        return sum(self.spent.values())
+
+    def report(self):
+        """stage -> {"planned", "actual"} plus the totals."""
+        stages = {stage: {"planned": round(self.plan.planned.get(stage, 0.0), 1),
+                          "actual": round(self.spent.get(stage, 0.0), 1)}
+                  for stage in TIERS}
+        stages["total"] = {"planned": round(sum(self.plan.planned.values()), 1),
+                           "actual": round(self.total, 1)}
+        return stages
+
+    def summary(self):
+        """Planned vs actual credits as message lines."""
+        lines = ["creditos (plan / real):"]
+        for stage, r in self.report().items():
+            if r["planned"] or r["actual"]:
+                lines.append(f"{stage}: {r['planned']:.0f} / {r['actual']:.0f}")
+        if self.plan.skipped:
+            lines.append(f"URLs fuera de presupuesto: {len(self.plan.skipped)}")
+        return "\n".join(lines)
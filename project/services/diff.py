@@ -0,0 +1,185 @@
+from project.services.prices import parse_price
+from project.utils.logger import logger
+from collections import Counter
+import json, hashlib
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+FINGERPRINT_FIELDS = ("price_cents", "competitor", "status")
+# "failed": the scrape failed this time; loaded as before but not notified
+KINDS = ("new", "price_up", "price_down", "seller_change", "unavailable", "recovered", "failed")
+NOTIFY_KINDS = ("new", "price_up", "price_down", "seller_change", "unavailable", "recovered")
+LABELS = {
+    "new": "nuevos", "price_up": "suben", "price_down": "bajan", "seller_change": "cambio de vendedor",
+    "unavailable": "no disponibles", "recovered": "vuelven", "failed": "fallidos",
+}
+TOP_MOVES = 5
+
+# ──────────────────────────────────────────────────────────────────────────────
+# FINGERPRINT: hash of the fields a change is made of, stored next to every
+# row of scrapped_competence (its fingerprint column) by the loader
+# ──────────────────────────────────────────────────────────────────────────────
+def _norm(value):
+    return "" if value is None else str(value)
+
+def fingerprint(row):
+    data = "\x1f".join(_norm(row.get(f)) for f in FINGERPRINT_FIELDS)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+def _state(row):
+    """Stored row -> the fields compared, with price_cents parsed for rows older than the typed columns."""
+    state = {f: row.get(f) for f in FINGERPRINT_FIELDS}
+    if state["price_cents"] is None:
+        state["price_cents"] = parse_price(row.get("price"))
+    return state
+
+def _money(cents):
+    return f"${cents / 100:,.0f}".replace(",", ".")
+
+def _db_state(links=None):
+    from project.database.db_manager import get_state
+    return get_state(links)
+
+def _db_fingerprints(links):
+    from project.database.db_manager import get_fingerprints
+    return get_fingerprints(links)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLASSIFICATION
+# ──────────────────────────────────────────────────────────────────────────────
+def classify(old, new):
+    """Change kinds of a catalog link between its stored state (old) and the new record."""
+    if old is None:
+        return ["new"]
+    status, before = new.get("status"), old.get("status")
+    if status == "discarded":
+        return ["unavailable"]
+    if status != "successed":
+        return ["failed"]
+    if before != "successed":
+        return ["recovered"]
+    kinds = []
+    price, old_price = new.get("price_cents"), old.get("price_cents")
+    if price is not None and old_price is not None and price != old_price:
+        kinds.append("price_up" if price > old_price else "price_down")
+    elif old_price is None and price is not None:
+        kinds.append("recovered")
+    elif price is None and old_price is not None:
+        kinds.append("unavailable")
+    if _norm(new.get("competitor")) != _norm(old.get("competitor")):
+        kinds.append("seller_change")
+    return kinds
+
+
+class Changeset:
+    """
+    What moved between the stored state and a new merged result set:
+    new and changed records (for the loader, each with its fingerprint), one
+    change entry per record with its kinds and old/new values (for
+    notifications and downstream), and the unchanged links.
+    """
+
+    def __init__(self):
+        self.new = []
+        self.changed = []
+        self.changes = []
+        self.unchanged = 0
+        self.seen = {}              # catalog_link -> timestamp of the unchanged records
+        self.missing = {}           # catalog_link -> fingerprint of unchanged rows stored without one
+
+    def add(self, record, old):
+        kinds = classify(old, record)
+        (self.new if old is None else self.changed).append(record)
+        old = old or {}
+        self.changes.append({
+            "catalog_link": record["catalog_link"],
+            "kinds": kinds,
+            "title": record.get("title"),
+            "old_price_cents": old.get("price_cents"),
+            "new_price_cents": record.get("price_cents"),
+            "old_competitor": old.get("competitor"),
+            "new_competitor": record.get("competitor"),
+            "old_status": old.get("status"),
+            "new_status": record.get("status"),
+            "currency": record.get("currency"),
+            "timestamp": record.get("timestamp"),
+        })
+
+    def __len__(self):
+        return len(self.changes)
+
+    def rows(self):
+        """New and changed records: what the loader writes and appends to history."""
+        return self.new + self.changed
+
+    def counts(self):
+        return Counter(kind for change in self.changes for kind in change["kinds"])
+
+    def moves(self, limit=TOP_MOVES):
+        """Largest relative price moves, biggest first."""
+        moved = [c for c in self.changes if {"price_up", "price_down"} & set(c["kinds"])]
+        moved.sort(key=lambda c: abs(c["new_price_cents"] / c["old_price_cents"] - 1) if c["old_price_cents"] else 0,
+                   reverse=True)
+        return moved[:limit]
+
+    def summary(self):
+        """Short Spanish summary for the WhatsApp message."""
+        counts = self.counts()
+        parts = [f"{LABELS[k]} {counts[k]}" for k in KINDS if counts[k]]
+        moved = sum(1 for c in self.changes if set(c["kinds"]) & set(NOTIFY_KINDS))
+        lines = [f"cambios: {moved}" + (f" ({', '.join(parts)})" if parts else "")]
+        for c in self.moves():
+            pct = (c["new_price_cents"] / c["old_price_cents"] - 1) * 100
+            lines.append(f"{pct:+.1f}% {_money(c['old_price_cents'])} -> {_money(c['new_price_cents'])} "
+                         f"{(c['title'] or '')[:40]}")
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Changes as NDJSON, one line per catalog link that moved."""
+        with open(path, "w", encoding="utf-8") as f:
+            for change in self.changes:
+                f.write(json.dumps(change, ensure_ascii=False) + "\n")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+def diff(records, index=None, lookup=None):
+    """
+    Compare merged records (with the typed price fields) with the stored
+    state. Every record gets its "fingerprint". The stored fingerprints of
+    the run's links (index, or the fingerprint column of the DB) are read
+    first and matching records are skipped; only the rest are checked
+    against their stored rows, fetched by lookup(links) (the DB by default),
+    so the work is proportional to what changed. The DB being the one
+    source, every instance that loads compares against the same state.
+    """
+    lookup = lookup or _db_state
+    if index is None:
+        index = _db_fingerprints([record["catalog_link"] for record in records]) if records else {}
+
+    changes = Changeset()
+    candidates = {}
+    for record in records:
+        fp = record["fingerprint"] = fingerprint(record)
+        if index.get(record["catalog_link"]) == fp:
+            changes.unchanged += 1
+            changes.seen[record["catalog_link"]] = record.get("timestamp")
+        else:
+            candidates[record["catalog_link"]] = (record, fp)
+
+    stored = lookup(list(candidates)) if candidates else {}
+    for link, (record, fp) in candidates.items():
+        old = stored.get(link)
+        old = _state(old) if old is not None else None
+        if old is not None and fingerprint(old) == fp:
+            # the row did not change; it was stored before it had a fingerprint
+            changes.unchanged += 1
+            changes.seen[link] = record.get("timestamp")
+            changes.missing[link] = fp
+            continue
+        changes.add(record, old)
+
+    logger.info(f"Diff: {len(changes.new)} nuevos, {len(changes.changed)} modificados, "
+                f"{changes.unchanged} sin cambios; {dict(changes.counts())}")
+    return changes
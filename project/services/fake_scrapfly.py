@@ -0,0 +1,150 @@
+from scrapfly import ScrapflyScrapeError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import os, asyncio, hashlib, random, threading, time
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+NOT_FOUND_PAGE = "<html><body><h3>Parece que esta página no existe</h3></body></html>"
+
+# ──────────────────────────────────────────────────────────────────────────────
+# RESPONSE
+# ──────────────────────────────────────────────────────────────────────────────
+class FakeHttpResponse:
+    def __init__(self, cost, status_code=200, reason="OK"):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = {"X-Scrapfly-Api-Cost": str(cost)}
+
+
+class FakeErrorApiResponse:
+    """The part of ScrapeApiResponse a failed scrape carries on its error (api_response)."""
+
+    def __init__(self, code, message, cost, status_code=422):
+        self.response = FakeHttpResponse(cost, status_code, "Unprocessable Entity")
+        self.error = {"code": code, "message": message, "links": {}}
+        self.upstream_status_code = None
+
+    @property
+    def error_message(self):
+        return f"<-- {self.response.status_code} | {self.error['code']} - {self.error['message']}."
+
+    def error_for(self):
+        """The ScrapflyScrapeError the SDK raises for this response."""
+        return ScrapflyScrapeError(request=None, response=self.response, message=self.error["message"],
+                                   code=self.error["code"], http_status_code=self.response.status_code,
+                                   resource="SCRAPE", is_retryable=True, api_response=self)
+
+
+class FakeScrapeResponse:
+    """The part of ScrapeApiResponse the scrapers use: .content and the cost header."""
+
+    def __init__(self, content, cost):
+        self.content = content
+        self.response = FakeHttpResponse(cost)
+        self.status_code = 200
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLIENT
+# ──────────────────────────────────────────────────────────────────────────────
+class FakeScrapflyClient:
+    """
+    Offline stand-in for ScrapflyClient (scrape / async_scrape) and the
+    account endpoint, serving the recorded PDP fixtures of fixtures_dir
+    (pdp_available.html, pdp_discarded.html, pdp_shield.html).
+
+    Every URL is deterministically available, discarded (discard_rate) or
+    missing (not_found_rate). Each request then draws, independently:
+      latency   - lognormal around latency_s (latency_sigma)
+      timeout   - timeout_rate, raises ERR::SCRAPE::OPERATION_TIMEOUT after timeout_s
+      shield    - shield_rate, serves the "actividad inusual" page; halved
+                  for configs with rendering_wait (the heavier ladder stages)
+      cost      - one of costs, charged to the account
+    async_scrape runs scrape() in async_executor, like the real client.
+    """
+
+    def __init__(self, fixtures_dir, latency_s=0.05, latency_sigma=0.5, timeout_rate=0.02,
+                 timeout_s=None, shield_rate=0.05, discard_rate=0.1, not_found_rate=0.01,
+                 costs=(25, 30, 30, 35), credits=1_000_000, seed=0):
+        self.pages = {name: self._load(fixtures_dir, name) for name in ("available", "discarded", "shield")}
+        self.latency_s = latency_s
+        self.latency_sigma = latency_sigma
+        self.timeout_rate = timeout_rate
+        self.timeout_s = latency_s * 4 if timeout_s is None else timeout_s
+        self.shield_rate = shield_rate
+        self.discard_rate = discard_rate
+        self.not_found_rate = not_found_rate
+        self.costs = costs
+        self.credits = credits
+        self.async_executor = ThreadPoolExecutor(max_workers=5)
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self.spent = 0
+        self.requests = 0
+        self.outcomes = {}
+        self.spans = {}     # url -> [first request start, last response end, requests]
+
+    @staticmethod
+    def _load(fixtures_dir, name):
+        with open(os.path.join(fixtures_dir, f"pdp_{name}.html"), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _bucket(self, url):
+        return int(hashlib.md5(url.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+    def _draw(self, config):
+        with self._lock:
+            latency = self._rnd.lognormvariate(0, self.latency_sigma) * self.latency_s
+            shield_rate = self.shield_rate / 2 if getattr(config, "rendering_wait", None) else self.shield_rate
+            roll = self._rnd.random()
+            cost = self._rnd.choice(self.costs)
+        if roll < self.timeout_rate:
+            return "timeout", self.timeout_s, cost
+        if roll < self.timeout_rate + shield_rate:
+            return "shield", latency, cost
+        return "page", latency, cost
+
+    def _charge(self, url, outcome, cost, started):
+        with self._lock:
+            self.requests += 1
+            self.spent += cost
+            self.credits -= cost
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            span = self.spans.setdefault(url, [started, 0.0, 0])
+            span[1] = time.monotonic()
+            span[2] += 1
+
+    def scrape(self, config):
+        url = config.url
+        started = time.monotonic()
+        outcome, latency, cost = self._draw(config)
+        time.sleep(latency)
+        if outcome == "timeout":
+            self._charge(url, outcome, cost, started)
+            raise FakeErrorApiResponse("ERR::SCRAPE::OPERATION_TIMEOUT", "Operation timed out", cost).error_for()
+        if outcome == "page":
+            bucket = self._bucket(url)
+            if bucket < self.not_found_rate:
+                outcome, content = "not_found", NOT_FOUND_PAGE
+            elif bucket < self.not_found_rate + self.discard_rate:
+                outcome, content = "discarded", self.pages["discarded"]
+            else:
+                outcome, content = "available", self.pages["available"]
+        else:
+            content = self.pages["shield"]
+        self._charge(url, outcome, cost, started)
+        return FakeScrapeResponse(content, cost)
+
+    async def async_scrape(self, config, loop=None):
+        loop = loop or asyncio.get_running_loop()
+        return await loop.run_in_executor(self.async_executor, self.scrape, config)
+
+    def account(self):
+        """Same shape as GET /account for the fields budget.py reads."""
+        today = datetime.now()
+        return {"subscription": {
+            "usage": {"scrape": {"remaining": self.credits, "current": self.spent}},
+            "period": {"start": (today - timedelta(days=15)).strftime("%Y-%m-%d %H:%M:%S"),
+                       "end": (today + timedelta(days=15)).strftime("%Y-%m-%d %H:%M:%S")},
+        }}
@@ -0,0 +1,66 @@
+from project.settings.config import TIER_DECAY_HOURS
+from project.utils.logger import logger
+import os, json, time
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PATHS / CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(__file__)
+PROFILES_JSON = os.path.join(BASE_DIR, "../database/url_profiles.json")
+# cheapest -> heaviest: the first pass config, then second_scrapp's ladder
+TIERS = ("first_pass", "first_attempt", "second_attempt", "heavy_retry", "rescue_pass", "deep_rescue")
+WORKED_STATUS = ("successed", "discarded")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PERSISTENCE
+# ──────────────────────────────────────────────────────────────────────────────
+def load_profiles(path=PROFILES_JSON):
+    """url -> {"stage", "cost", "latency", "updated"}; empty when there is no file yet."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_profiles(profiles, path=PROFILES_JSON):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+def start_tier(profiles, url, now=None):
+    """
+    Index in TIERS where this URL should start: the stage that last worked,
+    one tier lighter for every TIER_DECAY_HOURS elapsed since then.
+    """
+    profile = profiles.get(url)
+    if not profile or profile.get("stage") not in TIERS:
+        return 0
+    age_hours = ((now or time.time()) - profile.get("updated", 0)) / 3600
+    return max(0, TIERS.index(profile["stage"]) - int(age_hours // TIER_DECAY_HOURS))
+
+def record(profiles, url, stage, status, cost, latency):
+    """Remember the stage that worked for url, with its cost and latency."""
+    if status not in WORKED_STATUS:
+        return
+    profiles[url] = {
+        "stage": stage,
+        "cost": cost,
+        "latency": round(latency, 1),
+        "updated": time.time(),
+    }
+
+def split_by_tier(profiles, urls):
+    """Split urls into (first_pass_urls, {url: start_tier}) for the known-hard ones."""
+    light, hard = [], {}
+    for url in urls:
+        tier = start_tier(profiles, url)
+        if tier == 0:
+            light.append(url)
+        else:
+            hard[url] = tier
+    if hard:
+        logger.info(f"{len(hard)} URLs skip the first pass (learned fetch tier).")
+    return light, hard
@@ -1,10 +1,18 @@
 from project.utils.logger import logger
 from project.database.db_manager import get_urls
-from project.settings.config import SCRAP_KEY
-import os, json, asyncio, uuid, random
-from scrapfly import ScrapflyClient, ScrapeConfig
-from datetime import datetime
-from bs4 import BeautifulSoup
+from project.settings.config import (
+    SCRAPE_CONCURRENCY_START, SCRAPE_CONCURRENCY_MIN, SCRAPE_CONCURRENCY_MAX,
+    SCRAPE_TARGET_LATENCY, SCRAPE_FAILURE_TOLERANCE, THINK_TIME_MIN, THINK_TIME_MAX,
+)
+from project.services.pdp_parser import parse_product, empty_row, DISCARD_PHRASE
+from project.services.throttle import AdaptiveLimiter
+from project.services.blocking import classify_error
+from project.services.result_store import load_checkpoint, new_run_id
+from project.services.scheduler import schedule
+from project.services.canonical import dedupe
+from project.services.fetch_tiers import split_by_tier, record, TIERS
+import os, asyncio, uuid, time
+from scrapfly import ScrapeConfig
 
 # ──────────────────────────────────────────────────────────────────────────────
 # PATHS / CONSTANTS
@@ -12,36 +20,18 @@ from bs4 import BeautifulSoup
 BASE_DIR = os.path.dirname(__file__)
 DATABASE_DIR = os.path.join(BASE_DIR, "../database")
 URLS_JSON = os.path.join(DATABASE_DIR, "urls.json")
-RESULTS_JSON = os.path.join(DATABASE_DIR, "scrap_results.json")
-DISCARD_PHRASE = "Este producto no está disponible. Elige otra variante."
-
-# ──────────────────────────────────────────────────────────────────────────────
-# HELPERS
-# ──────────────────────────────────────────────────────────────────────────────
-
-
-
-def now_ts():
-    """Return current time formatted to seconds (ISO style)."""
-    return datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-
-def write_json(path, data):
-    """Write a list/dict to JSON file with UTF-8 encoding."""
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def api_cost(response):
-    """Returns the cost of the API call to Scrapfly"""
-    cost = getattr(getattr(response, "response", None), "headers", {}).get("X-Scrapfly-Api-Cost", "n/a")
-    return cost
+RESULTS_NDJSON = os.path.join(DATABASE_DIR, "scrap_results.ndjson")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # CORE:
 # ──────────────────────────────────────────────────────────────────────────────
-async def scrape_one(client, url, discard_phrase):
+async def scrape_one(client, url, discard_phrase, archive=None):
     """
     Scrape one URL and return a tuple describing the result.
+    The rendered page is kept in archive (an HtmlArchive) when given.
+    _fetch_s and _parse_s time the Scrapfly call and the extraction.
     """
+    started = time.monotonic()
     try:
         # create a unique session ID per scrape
         session_id = str(uuid.uuid4())
@@ -64,107 +54,155 @@ async def scrape_one(client, url, discard_phrase):
 
         # 2. Execute scrapping
         res = await client.async_scrape(cfg)
-        html = res.content
-        soup = BeautifulSoup(html, "html.parser")
-
-        # 3. Check availability
-        msg_el = soup.find(class_="ui-pdp-shipping-message__text")
-        if msg_el and discard_phrase in msg_el.get_text(strip=True):
-            parsed = {
-                "title": "n/a",
-                "price": "",
-                "competitor": "n/a",
-                "price_in_installments": "n/a",
-                "image": "n/a",
-                "_url": url,
-                "_timestamp": now_ts(),
-                "_status": "discarded",
-                "_api_cost": api_cost(res)
-            }
+        fetched = time.monotonic()
+
+        # 3. Extract fields & Parsing
+        parsed = parse_product(url, res, discard_phrase)
+        parsed["_fetch_s"] = round(fetched - started, 3)
+        parsed["_parse_s"] = round(time.monotonic() - fetched, 4)
+        if archive is not None:
+            await archive.store(parsed, res.content, "first_pass")
+
+        # 4. Check availability
+        if parsed["_status"] == "discarded":
             logger.warning(f"Discarded (not available)..")
             return parsed
 
-        # 4. Extract fields & Parsing
-        t = soup.find("h1", class_="ui-pdp-title")
-        precio_container = soup.find("div", {"class": "ui-pdp-price__second-line"})
-        p = precio_container.find("span", {"class": "andes-money-amount__fraction"}) if precio_container else None
-        c = soup.find("h2", class_="ui-seller-data-header__title")
-        q = soup.find("div", class_="ui-pdp-price__subtitles")
-        img = soup.find("img", class_="ui-pdp-image")
-        parsed = {
-            "title": (t.text.strip() if t else "n/a"),
-            "price": (p.text.strip() if p else ""),
-            "competitor": (c.text.strip() if c else "n/a"),
-            "price_in_installments": (q.text.strip() if q else "n/a"),
-            "image": (img["src"] if (img and img.get("src")) else "n/a"),
-            "_url": url,
-            "_timestamp": now_ts(),
-            "_status": "successed",
-            "_api_cost": api_cost(res),
-        }
-
         # 5. Validate if Failed
-        if parsed["title"] == "n/a":
-            parsed["_status"] = "failed"
-            logger.error(f"Failed to parse title.")
+        if parsed["_status"] == "failed":
+            logger.error(f"Failed to parse title ({parsed['failure_reason']}).")
             return parsed
         
         # 6. Validate if Successed
         logger.info(f"Successed Scrapping..")
         return parsed
     
-    except Exception:
-        logger.error(f"Exception while scraping..")
-        parsed = {
-            "title": "n/a",
-            "price": "",
-            "competitor": "n/a",
-            "price_in_installments": "n/a",
-            "image": "n/a",
-            "_url": url,
-            "_timestamp": now_ts(),
-            "_status": "failed",
-            "_api_cost": "n/a",
-        }
+    except Exception as e:
+        reason = classify_error(e)
+        logger.error(f"Exception while scraping ({reason}): {e}")
+        parsed = empty_row(url, "failed", reason=reason)
+        parsed["_fetch_s"] = round(time.monotonic() - started, 3)
         return parsed
 
-async def scrape_all(urls):
+async def scrape_all(ctx, urls, writer, on_row=None):
     """
-    Orchestrates scraping for all URLs.
-    Returns results, failures, and discarded URLs.
+    Orchestrates scraping for all URLs with the client, breaker, ledger,
+    archive and profiles of ctx (a RunContext).
+    urls can be any iterable of URLs, also a lazy one; db_manager.iter_urls
+    yields pages, so flatten it first (itertools.chain.from_iterable). A
+    fixed pool of SCRAPE_CONCURRENCY_MAX workers pulls them one at a time,
+    so dispatch starts with the first URL and the in-flight state stays
+    bounded whatever the catalog size.
+    Every row is tagged with the run id, appended to writer and handed to
+    on_row as soon as its job completes; ctx.on_progress("first_pass", done,
+    total) is called after each one. URLs that work here are recorded in the
+    profiles as "first_pass". Dispatch waits on the breaker (shared with the
+    rescue); once it gives up, the remaining URLs are written as failed with
+    reason "circuit_open" without being scraped. Likewise with reason
+    "budget" once the ledger stops the first pass.
+    Returns the count of rows per status.
     """
-    client = ScrapflyClient(key=SCRAP_KEY)
-    sem = asyncio.Semaphore(5)  # limit concurrency
+    limiter = AdaptiveLimiter(
+        start=SCRAPE_CONCURRENCY_START,
+        minimum=SCRAPE_CONCURRENCY_MIN,
+        maximum=SCRAPE_CONCURRENCY_MAX,
+        target_latency=SCRAPE_TARGET_LATENCY,
+        failure_tolerance=SCRAPE_FAILURE_TOLERANCE,
+        think_min=THINK_TIME_MIN,
+        think_max=THINK_TIME_MAX,
+    )
+    breaker, ledger, profiles = ctx.breaker, ctx.ledger, ctx.profiles
 
-    results = []
     # --- shared counter ---
     counter = [0]  # mutable wrapper
     lock = asyncio.Lock()
-    total = len(urls)
+    total = len(urls) if hasattr(urls, "__len__") else None
+
+    async def finish(parsed):
+        parsed["_run_id"] = ctx.run_id
+        writer.write(parsed)
+        ctx.count(parsed)
+        if on_row:
+            on_row(parsed)
+        async with lock:
+            counter[0] += 1
+            logger.info(f"[{counter[0]}/{total or '?'}] finished.. (limit {int(limiter.limit)})")
+            ctx.progress("first_pass", counter[0], total)
 
     async def job(url):
-        async with sem:
-            parsed = await scrape_one(client, url, DISCARD_PHRASE)
-            results.append(parsed)
-            async with lock:
-                counter[0] += 1
-                logger.info(f"[{counter[0]}/{total}] finished..")
+        queued = time.monotonic()
+        await limiter.acquire()
+        try:
+            # the budget is checked before the breaker: wait() may hand out the
+            # half-open probe, which has to end in a request and a record()
+            if ledger is not None and not ledger.reserve("first_pass"):
+                await finish(empty_row(url, "failed", 0, "budget"))
+                return
+            # an open breaker holds every slot until its cooldown ends
+            if not await breaker.wait():
+                if ledger is not None:
+                    ledger.release("first_pass")
+                await finish(empty_row(url, "failed", 0, "circuit_open"))
+                return
+            started = time.monotonic()
+            parsed = await scrape_one(ctx.client, url, DISCARD_PHRASE, ctx.archive)
+            parsed["_queue_s"] = round(started - queued, 3)
+            if ledger is not None:
+                ledger.charge("first_pass", parsed["_api_cost"])
+            await limiter.record(started, parsed["_status"], parsed["failure_reason"])
+            await breaker.record(parsed["failure_reason"])
+            if profiles is not None:
+                record(profiles, url, "first_pass", parsed["_status"], parsed["_api_cost"], time.monotonic() - started)
+            await finish(parsed)
             # add think-time delay
-            await asyncio.sleep(random.uniform(1.5, 3.5))
+            await asyncio.sleep(limiter.think_time())
+        finally:
+            await limiter.release()
+
+    pending = iter(urls)
+
+    async def worker():
+        # the iterator is shared: each URL is taken by exactly one worker
+        for url in pending:
+            await job(url)
 
-    await asyncio.gather(*(job(u) for u in urls))
-    return results
+    await asyncio.gather(*(worker() for _ in range(SCRAPE_CONCURRENCY_MAX)))
+    logger.info(f"Concurrency controller: {limiter.snapshot()}")
+    reasons = ctx.stage_counts("first_pass", ctx.reasons)
+    if reasons:
+        logger.info(f"First pass failure reasons: {reasons}")
+    return ctx.stage_counts("first_pass")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # MAIN
 # ──────────────────────────────────────────────────────────────────────────────
-def scrap_meli_urls():
+def plan_run(resume, results_path, profiles, shard=None, run_id=None):
     """
-    Entry point: load URLs, scrape, and save results.
+    Resolve what this run has to scrape: (run_id, first_pass_urls, deferred, append, groups).
+    Catalog links are deduplicated by item id first: URLs here are the
+    canonical targets and groups maps each one to its catalog links.
+    With resume=True the last run recorded in results_path is continued and
+    URLs already successed or discarded in it are skipped. Only the URLs the
+    scheduler finds due are kept, most overdue first. deferred maps the
+    URLs whose learned fetch tier is above the first pass to that tier.
+    shard=(k, n) keeps only that slice of the catalog; run_id, shared by
+    the shards of a run, is used instead of a new one.
     """
-    logger.info("START - First Scrapping Method.")
-    urls = get_urls()
-    #--- Run scraping ---
-    results = asyncio.run(scrape_all(urls))
-    write_json(RESULTS_JSON, results)
-    logger.info("END - First Scrapping Method.")
+    checkpoint, done = load_checkpoint(results_path) if resume else (None, set())
+    if checkpoint is None or (run_id and checkpoint != run_id):
+        run_id, done, resume = run_id or new_run_id(), set(), False
+    else:
+        run_id = checkpoint
+    targets, groups = dedupe(get_urls(shard=shard))
+    urls = schedule([u for u in targets if u not in done], profiles, groups=groups)
+    if done:
+        logger.info(f"Resuming run {run_id}: {len(done)} URLs already done, {len(urls)} left.")
+    urls, deferred = split_by_tier(profiles, urls)
+    return run_id, urls, deferred, resume, groups
+
+def deferred_row(url, tier, run_id):
+    """Placeholder row for a URL sent straight to the rescue ladder."""
+    row = empty_row(url, "deferred", 0)
+    row["start_stage"] = TIERS[tier]
+    row["_run_id"] = run_id
+    return row
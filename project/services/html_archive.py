@@ -0,0 +1,108 @@
+from project.settings.config import HTML_ARCHIVE_KEEP_RUNS
+from project.services.result_store import NdjsonWriter, read_ndjson
+from project.utils.logger import logger
+import os, glob, gzip, hashlib, threading, asyncio
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PATHS / CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(__file__)
+ARCHIVE_DIR = os.path.join(BASE_DIR, "../database/html_archive")
+COMPRESS_LEVEL = 6
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def blob_path(root, sha):
+    return os.path.join(root, "blobs", sha[:2], f"{sha}.html.gz")
+
+def run_index_path(root, run_id):
+    return os.path.join(root, "runs", f"{run_id}.ndjson")
+
+def read_blob(root, sha):
+    with gzip.open(blob_path(root, sha), "rt", encoding="utf-8") as f:
+        return f.read()
+
+def read_index(run_id, root=ARCHIVE_DIR):
+    """Archived pages of a run: {"url", "sha", "stage", "cost", "timestamp"} per scrape."""
+    return read_ndjson(run_index_path(root, run_id))
+
+def archived_runs(root=ARCHIVE_DIR):
+    """Run ids with an index, oldest first."""
+    paths = glob.glob(os.path.join(root, "runs", "*.ndjson"))
+    return sorted(os.path.basename(p)[:-len(".ndjson")] for p in paths)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+class HtmlArchive:
+    """
+    Content-addressed store of the rendered HTML of one run.
+    Pages are gzipped under blobs/<sha[:2]>/<sha>.html.gz, so a page that did
+    not change between runs is stored once; runs/<run_id>.ndjson lists what
+    each scrape of the run returned.
+    """
+
+    def __init__(self, run_id, root=ARCHIVE_DIR):
+        self.root = root
+        self.run_id = run_id
+        os.makedirs(os.path.join(root, "runs"), exist_ok=True)
+        self._index = NdjsonWriter(run_index_path(root, run_id), append=True)
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.stored_bytes = 0
+
+    def put(self, url, html, stage, cost, timestamp):
+        """Store one scraped page and return its sha256."""
+        data = (html or "").encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        path = blob_path(self.root, sha)
+        stored = 0
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            compressed = gzip.compress(data, COMPRESS_LEVEL)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp, path)
+            stored = len(compressed)
+        with self._lock:
+            self._index.write({"url": url, "sha": sha, "stage": stage, "cost": cost, "timestamp": timestamp})
+            self.pages += 1
+            self.stored_bytes += stored
+        return sha
+
+    async def store(self, row, html, stage):
+        """Archive the page behind a result row (off the event loop); failures are only logged."""
+        try:
+            row["_html_sha"] = await asyncio.to_thread(
+                self.put, row["_url"], html, stage, row["_api_cost"], row["_timestamp"])
+        except Exception:
+            logger.exception("Could not archive page.")
+
+    def close(self):
+        self._index.close()
+        logger.info(f"HTML archive: {self.pages} pages for run {self.run_id}, "
+                    f"{self.stored_bytes / 1e6:.1f} MB of new blobs.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def prune(keep=HTML_ARCHIVE_KEEP_RUNS, root=ARCHIVE_DIR):
+    """Drop all but the last `keep` runs and the blobs no remaining run uses."""
+    runs = archived_runs(root)
+    if len(runs) <= keep:
+        return
+    for run_id in runs[:len(runs) - keep]:
+        os.remove(run_index_path(root, run_id))
+    used = {entry["sha"] for run_id in runs[len(runs) - keep:] for entry in read_index(run_id, root)}
+    removed = 0
+    for path in glob.glob(os.path.join(root, "blobs", "*", "*.html.gz")):
+        if os.path.basename(path)[:-len(".html.gz")] not in used:
+            os.remove(path)
+            removed += 1
+    logger.info(f"HTML archive: kept {keep} runs, removed {removed} unused pages.")
@@ -0,0 +1,197 @@
+from project.utils.logger import logger
+from datetime import datetime
+import os, json, glob, shutil, threading, time, uuid
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PATHS / CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(__file__)
+JOBS_DIR = os.path.join(BASE_DIR, "../database/jobs")
+JOB_JSON = "job.json"
+ACTIVE_STATES = ("queued", "running")
+POLICIES = ("coalesce", "queue", "reject")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def now_ts():
+    return datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+
+def saved_jobs(root=JOBS_DIR):
+    """Job states saved in the working directories under root, oldest first."""
+    jobs = []
+    for path in glob.glob(os.path.join(root, "*", JOB_JSON)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                jobs.append(json.load(f))
+        except (OSError, ValueError):
+            logger.warning(f"Skipping unreadable job state {path}.")
+    return sorted(jobs, key=lambda job: job["id"])
+
+# ──────────────────────────────────────────────────────────────────────────────
+# JOB
+# ──────────────────────────────────────────────────────────────────────────────
+class Job:
+    """One scraping run (or one shard of a run): id, working directory, state, progress and timing."""
+
+    def __init__(self, workdir, resume=False, shard=None, run_id=None):
+        self.id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.workdir = workdir or os.path.join(JOBS_DIR, self.id)
+        self.resume = resume
+        self.shard = shard      # (k, n) or None for the whole catalog
+        self.run_id = run_id    # shared by the shards of a run
+        self.state = "queued"
+        self.phase = None
+        self.progress = {}      # phase -> {"done": n, "total": n}
+        self.triggers = 1       # POSTs served by this job (coalesced ones included)
+        self.error = None
+        self.created_at = now_ts()
+        self.started_at = None
+        self.finished_at = None
+        self._t0 = None
+        self._t1 = None
+
+    def on_progress(self, phase, done, total):
+        """Progress hook handed to the pipeline (phase, done, total)."""
+        self.phase = phase
+        if total is not None:
+            self.progress[phase] = {"done": done, "total": total}
+
+    def save(self):
+        """Write the job state to its working directory, so it outlives the process."""
+        path = os.path.join(self.workdir, JOB_JSON)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({**self.to_dict(), "workdir": os.path.abspath(self.workdir)}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def to_dict(self):
+        end = self._t1 or time.monotonic()
+        return {
+            "id": self.id,
+            "state": self.state,
+            "phase": self.phase,
+            "progress": self.progress,
+            "resume": self.resume,
+            "shard": f"{self.shard[0]}/{self.shard[1]}" if self.shard else None,
+            "run_id": self.run_id,
+            "triggers": self.triggers,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_s": round(end - self._t0, 1) if self._t0 else None,
+        }
+
+# ──────────────────────────────────────────────────────────────────────────────
+# MANAGER
+# ──────────────────────────────────────────────────────────────────────────────
+class JobManager:
+    """
+    In-process single-flight runner: at most one job runs at a time.
+    A trigger while a job is active is handled by `policy`:
+      coalesce - return the active job, no new run (default)
+      queue    - keep at most one follow-up job queued behind the running one
+      reject   - refuse it
+    Coalescing only joins jobs for the same shard of the same run: another
+    shard is queued behind the active job instead. Shard jobs are never
+    rejected, a run only completes once all its shards ran; under reject a
+    repeated trigger for the same shard is coalesced.
+    `runner(resume=..., workdir=..., on_progress=..., shard=..., run_id=...)`
+    does the actual work.
+    """
+
+    def __init__(self, runner, policy="coalesce", keep=10):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown job policy {policy!r}, expected one of {POLICIES}")
+        self.runner = runner
+        self.policy = policy
+        self.keep = keep
+        self._jobs = {}         # id -> Job, in creation order
+        self._queue = []
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, resume=False, shard=None, run_id=None):
+        """Return (job, accepted): accepted is False when the trigger was coalesced or rejected."""
+        with self._lock:
+            active = [j for j in self._jobs.values() if j.state in ACTIVE_STATES]
+            if active:
+                if self.policy == "reject" and shard is None:
+                    return active[0], False
+                same = [j for j in active if (j.shard, j.run_id) == (shard, run_id)]
+                queued = [j for j in self._queue if j in same]
+                if same and (self.policy != "queue" or queued):
+                    target = queued[-1] if queued else same[0]
+                    target.triggers += 1
+                    return target, False
+
+            job = Job(self._resume_dir(shard) if resume else None, resume, shard, run_id)
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._prune()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_queue, daemon=True)
+                self._worker.start()
+            return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def recent(self, limit=10):
+        with self._lock:
+            return list(self._jobs.values())[::-1][:limit]
+
+    def _resume_dir(self, shard=None):
+        # resume continues in the directory of the last job (of that shard) that did not
+        # succeed. Job states are read from disk so a restart does not lose them: a job
+        # saved as running that this process is not running died with the old one.
+        label = f"{shard[0]}/{shard[1]}" if shard else None
+        for job in reversed(saved_jobs()):
+            if job.get("shard") != label:
+                continue
+            if job["state"] == "succeeded":
+                return None
+            live = self._jobs.get(job["id"])
+            if job["state"] == "failed" or (job["state"] == "running" and live is None):
+                return job["workdir"]
+        return None
+
+    def _prune(self):
+        # forget the oldest finished jobs and remove their working directories
+        finished = [j for j in self._jobs.values() if j.state not in ACTIVE_STATES]
+        for job in finished[:max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[job.id]
+            shared = any(os.path.abspath(j.workdir) == os.path.abspath(job.workdir) for j in self._jobs.values())
+            if not shared and os.path.abspath(job.workdir).startswith(os.path.abspath(JOBS_DIR)):
+                shutil.rmtree(job.workdir, ignore_errors=True)
+
+    def _run_queue(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._worker = None
+                    return
+                job = self._queue.pop(0)
+                job.state = "running"
+                job.started_at = now_ts()
+                job._t0 = time.monotonic()
+            logger.info(f"Job {job.id} started (workdir {job.workdir}).")
+            try:
+                os.makedirs(job.workdir, exist_ok=True)
+                job.save()
+                self.runner(resume=job.resume, workdir=job.workdir, on_progress=job.on_progress,
+                            shard=job.shard, run_id=job.run_id)
+                job.state = "succeeded"
+            except Exception as e:
+                logger.exception(f"Job {job.id} failed.")
+                job.state = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+            finally:
+                job._t1 = time.monotonic()
+                job.finished_at = now_ts()
+                try:
+                    job.save()
+                except OSError as e:
+                    logger.warning(f"Job {job.id} state not saved: {e}")
+            logger.info(f"Job {job.id} {job.state} in {job._t1 - job._t0:.0f}s.")
@@ -1,27 +1,25 @@
-from project.utils.logger import logger
-from project.database.db_manager import load_scrap
-import pandas as pd
+from project.services.blocking import NOT_SENT_REASONS
+import math
 import json
 import os
 
 # ──────────────────────────────────────────────────────────────
-# PATHS / CONSTANTS
+# CONSTANTS
 # ──────────────────────────────────────────────────────────────
-BASE_DIR = os.path.dirname(__file__)
-DATABASE_DIR = os.path.join(BASE_DIR, '../database')
-SCRAP_RESULTS_PATH = os.path.join(DATABASE_DIR, 'scrap_results.json')
-FAILED_SCRAP_PATH = os.path.join(DATABASE_DIR, 'scrapping_failed_urls.json')
-OUTPUT_PATH = os.path.join(DATABASE_DIR, 'merged_results.json')
+COLUMN_MAPPING = {
+    "_url": "catalog_link",
+    "_timestamp": "timestamp",
+    "_status": "status",
+}
 
 # ──────────────────────────────────────────────────────────────
 # HELPERS
 # ──────────────────────────────────────────────────────────────
 def load_json_list(path):
     """Load a JSON file as a list of dicts."""
-    print("trying..")
     if not os.path.exists(path):
         return []
-    
+
     if os.path.getsize(path) > 0:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -29,55 +27,80 @@ def load_json_list(path):
     else:
         return []
 
-def safe_numeric(series):
-    """Convert a series to numeric, coerce errors to 0."""
-    return pd.to_numeric(series, errors="coerce").fillna(0)
+def safe_numeric(value):
+    """Convert a value to a number, coerce errors to 0."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    if math.isnan(number):
+        return 0
+    return int(number) if number.is_integer() else number
 
 # ──────────────────────────────────────────────────────────────
-# CORE: build merged union with last record + sum of api cost
+# CORE: single-pass reducer, last record + sum of api cost per URL
 # ──────────────────────────────────────────────────────────────
-def merge_scraping():
-
-    # 1. Load JSONs
-    scrap_rows  = load_json_list(SCRAP_RESULTS_PATH)
-    failed_rows = load_json_list(FAILED_SCRAP_PATH)
+class ScrapMerger:
+    """
+    Streaming replacement of the old sort + groupby(last/sum) + merge.
+    Keeps one compact record per URL: the values of the latest row by
+    _timestamp (a newer row overrides every non-null field, an older one only
+    fills missing fields) plus the running sum of _api_cost.
+    Rows of URLs that were never requested (NOT_SENT_REASONS, deferred
+    placeholders) carry no page data and are left out, so a breaker trip or
+    a spent budget never overwrites what is stored for them.
+    """
 
-    # 2. Convert to DataFrame
-    df_scrap  = pd.DataFrame(scrap_rows)
-    df_failed = pd.DataFrame(failed_rows)
-
-    # If failed_rows is empty, just work with scrap_rows
-    if df_failed.empty:
-        df_all = df_scrap.copy()
-    else:
-        # Combine both sources
-        df_all = pd.concat([df_scrap, df_failed], ignore_index=True)
+    def __init__(self):
+        self.rows = 0
+        self.not_sent = 0
+        self._columns = []    # every column seen, in arrival order
+        self._index = {}      # column -> position in a record
+        self._latest = {}     # url -> [values..., api cost total]
 
-    if df_all.empty:
-        logger.info("No data to process.")
-        return
+    def _position(self, key):
+        pos = self._index.get(key)
+        if pos is None:
+            pos = self._index[key] = len(self._columns)
+            self._columns.append(key)
+        return pos
 
-    # 3.Sort Values by scrapped timestamp
-    df_all = df_all.sort_values("_timestamp")
+    def add(self, row):
+        if row.get("failure_reason") in NOT_SENT_REASONS or row.get("_status") == "deferred":
+            self.not_sent += 1
+            return
+        url = row["_url"]
+        self.rows += 1
+        cost = safe_numeric(row.get("_api_cost"))
+        values = [(self._position(k), v) for k, v in row.items() if v is not None]
+        values.append((self._position("_api_cost"), cost))
 
-    # 4. Safe cast _api_cost to numeric
-    df_all["_api_cost"] = safe_numeric(df_all.get("_api_cost", 0))
+        current = self._latest.get(url)
+        if current is None:
+            current = self._latest[url] = [None] * (len(self._columns) + 1)
+            current[-1] = 0
+        elif len(current) <= len(self._columns):
+            current[-1:-1] = [None] * (len(self._columns) + 1 - len(current))
 
-    # 5. Group by _url, keep last record per URL, sum _api_cost
-    last_records = df_all.groupby("_url").last().reset_index()
-    sum_costs = df_all.groupby("_url")["_api_cost"].sum().reset_index().rename(columns={"_api_cost": "_api_cost_total"})
+        ts_pos = self._index.get("_timestamp")
+        newer = ts_pos is None or current[ts_pos] is None or (row.get("_timestamp") or "") >= current[ts_pos]
+        for pos, value in values:
+            if newer or current[pos] is None:
+                current[pos] = value
+        current[-1] += cost
 
-    # 6. Merge last record with sum of api cost
-    merged_df = pd.merge(last_records, sum_costs, on="_url")
+    def __len__(self):
+        return len(self._latest)
 
-    column_mapping = {
-        "_url": "catalog_link",
-        "_timestamp": "timestamp",
-        "_status": "status",
-        "_api_cost_total": "api_cost_total"
-    }
-    merged_df = merged_df.rename(columns=column_mapping)
+    def record(self, url):
+        """Merged record for one URL, with the loader's column names."""
+        values = self._latest[url]
+        merged = {COLUMN_MAPPING.get(k, k): (values[i] if i < len(values) - 1 else None)
+                  for i, k in enumerate(self._columns)}
+        merged["api_cost_total"] = values[-1]
+        return merged
 
-    print(merged_df)
+    def records(self):
+        """Merged records sorted by URL, ready for load_scrap."""
+        return [self.record(url) for url in sorted(self._latest)]
 
-    load_scrap(merged_df.to_dict(orient="records"))
@@ -0,0 +1,214 @@
+from project.services.blocking import NOT_SENT_REASONS
+from project.utils.logger import logger
+import json, math, threading, time
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+# Scrapfly round trip, seconds (render_js + ASP requests take 10-90s)
+FETCH_BUCKETS = (1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, math.inf)
+PREFIX = "meli_scrape"
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def stage_of(row):
+    return row.get("retry_stage") or "first_pass"
+
+def _credits(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+def _le(bound):
+    return "+Inf" if bound == math.inf else f"{bound:g}"
+
+def _quantile(values, q):
+    if not values:  # also None: no samples kept
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(q * (len(values) - 1))))], 3)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+class StageStats:
+    """Outcomes, credits and timings of every request sent at one stage."""
+
+    def __init__(self, keep_samples=True):
+        self.statuses = {}
+        self.reasons = {}        # failed requests by reason, plus URLs never sent
+        self.credits = 0.0
+        self.buckets = [0] * len(FETCH_BUCKETS)
+        self.fetch = [] if keep_samples else None   # Scrapfly seconds per request, for quantiles
+        self.fetch_sum = 0.0
+        self.fetch_count = 0
+        self.queue_s = 0.0
+        self.parse_s = 0.0
+
+    def observe(self, row):
+        reason = row.get("failure_reason")
+        if reason:
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        if reason in NOT_SENT_REASONS:
+            return
+        status = row.get("_status") or "unknown"
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.credits += _credits(row.get("_api_cost"))
+        self.queue_s += row.get("_queue_s") or 0.0
+        self.parse_s += row.get("_parse_s") or 0.0
+        fetch = row.get("_fetch_s")
+        if fetch is not None:
+            if self.fetch is not None:
+                self.fetch.append(fetch)
+            self.fetch_sum += fetch
+            self.fetch_count += 1
+            for i, bound in enumerate(FETCH_BUCKETS):
+                if fetch <= bound:
+                    self.buckets[i] += 1
+                    break
+
+    @property
+    def requests(self):
+        return sum(self.statuses.values())
+
+    def summary(self):
+        n = self.requests
+        return {
+            "requests": n,
+            "rates": {s: round(c / n, 3) for s, c in self.statuses.items()} if n else {},
+            "reasons": self.reasons,
+            "credits": round(self.credits, 1),
+            "fetch_p50_s": _quantile(self.fetch, 0.50),
+            "fetch_p95_s": _quantile(self.fetch, 0.95),
+            "fetch_total_s": round(self.fetch_sum, 1),
+            "queue_total_s": round(self.queue_s, 1),
+            "parse_total_s": round(self.parse_s, 2),
+        }
+
+
+class RunMetrics:
+    """
+    Aggregates the per-request spans carried on result rows (_queue_s,
+    _fetch_s, _parse_s, stage, status, reason, cost) per stage. One instance
+    per run; PROCESS keeps the totals of every run served by this process.
+    """
+
+    def __init__(self, run_id=None, parent=None, keep_samples=True):
+        self.run_id = run_id
+        self.parent = parent
+        self.keep_samples = keep_samples
+        self.stages = {}
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def observe(self, row):
+        # placeholder rows (deferred URLs) are not requests
+        if row.get("_status") == "deferred":
+            return
+        with self._lock:
+            self.stages.setdefault(stage_of(row), StageStats(self.keep_samples)).observe(row)
+        if self.parent is not None:
+            self.parent.observe(row)
+
+    def finish(self):
+        self.finished = time.time()
+
+    def summary(self):
+        with self._lock:
+            stages = {stage: stats.summary() for stage, stats in self.stages.items()}
+        end = self.finished or time.time()
+        return {
+            "run_id": self.run_id,
+            "wall_s": round(end - self.started, 1),
+            "requests": sum(s["requests"] for s in stages.values()),
+            "credits": round(sum(s["credits"] for s in stages.values()), 1),
+            "stages": stages,
+        }
+
+    def prometheus(self):
+        """Counters and the fetch latency histogram in Prometheus text format."""
+        lines = [
+            f"# HELP {PREFIX}_requests_total Scrapfly requests by stage and status.",
+            f"# TYPE {PREFIX}_requests_total counter",
+        ]
+        with self._lock:
+            stages = sorted(self.stages.items())
+            for stage, s in stages:
+                for status, count in sorted(s.statuses.items()):
+                    lines.append(f"{PREFIX}_requests_total{_labels(stage=stage, status=status)} {count}")
+            lines += [f"# HELP {PREFIX}_failures_total Failed requests by stage and reason.",
+                      f"# TYPE {PREFIX}_failures_total counter"]
+            for stage, s in stages:
+                for reason, count in sorted(s.reasons.items()):
+                    lines.append(f"{PREFIX}_failures_total{_labels(stage=stage, reason=reason)} {count}")
+            lines += [f"# HELP {PREFIX}_credits_total Scrapfly credits spent by stage.",
+                      f"# TYPE {PREFIX}_credits_total counter"]
+            for stage, s in stages:
+                lines.append(f"{PREFIX}_credits_total{_labels(stage=stage)} {s.credits:g}")
+            for name, attr in (("queue", "queue_s"), ("parse", "parse_s")):
+                lines += [f"# HELP {PREFIX}_{name}_seconds_total Seconds spent in {name} by stage.",
+                          f"# TYPE {PREFIX}_{name}_seconds_total counter"]
+                for stage, s in stages:
+                    lines.append(f"{PREFIX}_{name}_seconds_total{_labels(stage=stage)} {getattr(s, attr):.3f}")
+            lines += [f"# HELP {PREFIX}_fetch_seconds Scrapfly round trip by stage.",
+                      f"# TYPE {PREFIX}_fetch_seconds histogram"]
+            for stage, s in stages:
+                cumulative = 0
+                for bound, count in zip(FETCH_BUCKETS, s.buckets):
+                    cumulative += count
+                    lines.append(f"{PREFIX}_fetch_seconds_bucket{_labels(stage=stage, le=_le(bound))} {cumulative}")
+                lines.append(f"{PREFIX}_fetch_seconds_sum{_labels(stage=stage)} {s.fetch_sum:.3f}")
+                lines.append(f"{PREFIX}_fetch_seconds_count{_labels(stage=stage)} {s.fetch_count}")
+        return "\n".join(lines) + "\n"
+
+
+PROCESS = RunMetrics(keep_samples=False)
+_runs = []          # recent runs, newest last
+_runs_lock = threading.Lock()
+
+def start_run(run_id):
+    """New RunMetrics for run_id, also feeding the process totals."""
+    run = RunMetrics(run_id, parent=PROCESS)
+    with _runs_lock:
+        _runs.append(run)
+        del _runs[:-5]
+    return run
+
+def last_run():
+    with _runs_lock:
+        return _runs[-1] if _runs else None
+
+def write_summary(run, path):
+    """Finish run, log its compact summary and write it to path as JSON."""
+    run.finish()
+    summary = run.summary()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    compact = {stage: (s["requests"], s["rates"].get("successed", 0), s["credits"], s["fetch_p50_s"])
+               for stage, s in summary["stages"].items()}
+    logger.info(f"Run {run.run_id} in {summary['wall_s']}s, {summary['requests']} requests, "
+                f"{summary['credits']} credits; per stage (requests, success rate, credits, p50 s): {compact}")
+    return summary
+
+def exposition():
+    """Prometheus text for /metrics: process totals plus gauges of the last run."""
+    text = PROCESS.prometheus()
+    run = last_run()
+    if run is not None:
+        summary = run.summary()
+        text += (f"# HELP {PREFIX}_last_run_seconds Wall time of the last (or current) run.\n"
+                 f"# TYPE {PREFIX}_last_run_seconds gauge\n"
+                 f"{PREFIX}_last_run_seconds{_labels(run_id=run.run_id)} {summary['wall_s']}\n"
+                 f"# HELP {PREFIX}_last_run_credits Credits spent by the last (or current) run.\n"
+                 f"# TYPE {PREFIX}_last_run_credits gauge\n"
+                 f"{PREFIX}_last_run_credits{_labels(run_id=run.run_id)} {summary['credits']}\n"
+                 f"# HELP {PREFIX}_last_run_in_progress 1 while the last run is still going.\n"
+                 f"# TYPE {PREFIX}_last_run_in_progress gauge\n"
+                 f"{PREFIX}_last_run_in_progress {0 if run.finished else 1}\n")
+    return text
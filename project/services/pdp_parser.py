@@ -0,0 +1,249 @@
+from project.services.prices import empty_prices, normalize_row
+from html.parser import HTMLParser
+from datetime import datetime
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+DISCARD_PHRASE = "Este producto no está disponible. Elige otra variante."
+CHUNK_SIZE = 64 * 1024
+
+# field -> (tag or None for any tag, class token)
+TARGETS = {
+    "message": (None, "ui-pdp-shipping-message__text"),
+    "title": ("h1", "ui-pdp-title"),
+    "price_box": ("div", "ui-pdp-price__second-line"),
+    "competitor": ("h2", "ui-seller-data-header__title"),
+    "installments": ("div", "ui-pdp-price__subtitles"),
+    "image": ("img", "ui-pdp-image"),
+}
+PRICE_TARGET = ("span", "andes-money-amount__fraction")
+FIELDS = ("message", "title", "price", "competitor", "installments", "image")
+
+# block / missing page markers, matched on the lowercased page
+SHIELD_MARKERS = ("actividad inusual", "protegemos a nuestros usuarios")
+CAPTCHA_MARKERS = ("g-recaptcha", "h-captcha", "captcha")
+NOT_FOUND_MARKERS = ("parece que esta página no existe", "parece que esta pagina no existe")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def now_ts():
+    """Return current time formatted to seconds (ISO style)."""
+    return datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+
+def api_cost(response):
+    """Returns the cost of the API call to Scrapfly"""
+    return getattr(getattr(response, "response", None), "headers", {}).get("X-Scrapfly-Api-Cost", "n/a")
+
+def empty_row(url, status, cost="n/a", reason=None):
+    """Row with placeholder values, used for discarded pages and errors."""
+    return {
+        "title": "n/a",
+        "price": "",
+        "competitor": "n/a",
+        "price_in_installments": "n/a",
+        "image": "n/a",
+        "_url": url,
+        "_timestamp": now_ts(),
+        "_status": status,
+        "_api_cost": cost,
+        "failure_reason": reason,
+        **empty_prices(),
+    }
+
+def looks_blocked(html):
+    """Block reason for a page without a product title: "shield", "captcha" or None."""
+    text = (html or "").lower()
+    if any(m in text for m in SHIELD_MARKERS):
+        return "shield"
+    if any(m in text for m in CAPTCHA_MARKERS):
+        return "captcha"
+    return None
+
+def classify_page(html):
+    """Why a page has no product title: shield, captcha, not_found or parse_failed."""
+    blocked = looks_blocked(html)
+    if blocked:
+        return blocked
+    text = (html or "").lower()
+    if any(m in text for m in NOT_FOUND_MARKERS):
+        return "not_found"
+    return "parse_failed"
+
+def _has_class(attrs, token):
+    for name, value in attrs:
+        if name == "class" and value:
+            return token == value or token in value.split()
+    return False
+
+# ──────────────────────────────────────────────────────────────────────────────
+# SCANNER: streams the page through HTMLParser without building a tree and
+# stops as soon as every field has been resolved.
+# ──────────────────────────────────────────────────────────────────────────────
+class _PdpScanner(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found = {}      # field -> list of text nodes (or image src)
+        self._open = []      # [field, tag, depth, parts]
+        self._in_text = False
+        self.symbol = None   # price_box text before the price fraction ("$", "US$")
+
+    @property
+    def done(self):
+        return len(self.found) == len(FIELDS)
+
+    def _match(self, tag, attrs):
+        active = {o[0] for o in self._open}
+        for field, (target_tag, token) in TARGETS.items():
+            if field in self.found or field in active or (target_tag and target_tag != tag):
+                continue
+            if field == "price_box" and "price" in self.found:
+                continue
+            if _has_class(attrs, token):
+                return field
+        if ("price_box" in active and "price" not in active and "price" not in self.found
+                and tag == PRICE_TARGET[0] and _has_class(attrs, PRICE_TARGET[1])):
+            return "price"
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        self._in_text = False
+        for o in self._open:
+            if o[1] == tag:
+                o[2] += 1
+        field = self._match(tag, attrs)
+        if field == "image":
+            self.found["image"] = dict(attrs).get("src")
+        elif field:
+            if field == "price":
+                self.symbol = "".join(next(o[3] for o in self._open if o[0] == "price_box")).strip()
+            self._open.append([field, tag, 1, []])
+
+    def handle_endtag(self, tag):
+        self._in_text = False
+        still_open = []
+        for o in self._open:
+            if o[1] == tag:
+                o[2] -= 1
+            if o[2] > 0:
+                still_open.append(o)
+            else:
+                self._close(o)
+        self._open = still_open
+
+    def handle_data(self, data):
+        for o in self._open:
+            if self._in_text and o[3]:
+                o[3][-1] += data
+            else:
+                o[3].append(data)
+        self._in_text = True
+
+    def handle_comment(self, data):
+        self._in_text = False
+
+    def _close(self, o):
+        field = o[0]
+        if field == "price_box":
+            # container closed without a fraction: price stays empty
+            self.found.setdefault("price", None)
+        else:
+            self.found.setdefault(field, o[3])
+
+    def skip_absent(self, html, pos):
+        """Resolve as missing the fields whose class never shows up again after pos."""
+        active = {o[0] for o in self._open}
+        for field, (_, token) in TARGETS.items():
+            if field == "price_box":
+                if "price" in self.found or "price" in active or "price_box" in active:
+                    continue
+                field = "price"
+            elif field in self.found or field in active:
+                continue
+            if html.find(token, pos) < 0:
+                self.found[field] = None
+
+    def finish(self):
+        for o in self._open:
+            self._close(o)
+        self._open = []
+        for field in FIELDS:
+            self.found.setdefault(field, None)
+
+
+def extract_fields(html):
+    """
+    Scan a rendered product page and return the raw fields:
+    message, title, price, currency_symbol, competitor, installments and
+    image. Missing elements are returned as None.
+    """
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    scanner = _PdpScanner()
+    scanner.skip_absent(html, 0)
+    for start in range(0, len(html), CHUNK_SIZE):
+        if scanner.done:
+            break
+        end = start + CHUNK_SIZE
+        scanner.feed(html[start:end])
+        scanner.skip_absent(html, min(end, len(html)) - len(scanner.rawdata))
+    scanner.finish()
+    found = scanner.found
+
+    def text(field):
+        parts = found[field]
+        return "".join(parts).strip() if parts is not None else None
+
+    return {
+        "message": "".join(p.strip() for p in found["message"]) if found["message"] is not None else None,
+        "title": text("title"),
+        "price": text("price"),
+        "currency_symbol": scanner.symbol or None,
+        "competitor": text("competitor"),
+        "installments": text("installments"),
+        "image": found["image"],
+    }
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE: html -> result row
+# ──────────────────────────────────────────────────────────────────────────────
+def parse_html(url, html, cost="n/a", discard_phrase=DISCARD_PHRASE):
+    """
+    Build the result row for one product page.
+    _status is "discarded" when the variant is not available, "failed" when
+    the title is missing and "successed" otherwise; failed rows carry the
+    classify_page() reason in failure_reason. The typed price fields
+    (prices.PRICE_FIELDS) come next to the raw strings.
+    """
+    fields = extract_fields(html)
+
+    # 1. Check availability
+    if fields["message"] is not None and discard_phrase in fields["message"]:
+        return empty_row(url, "discarded", cost)
+
+    # 2. Map fields
+    parsed = {
+        "title": fields["title"] if fields["title"] is not None else "n/a",
+        "price": fields["price"] or "",
+        "competitor": fields["competitor"] if fields["competitor"] is not None else "n/a",
+        "price_in_installments": fields["installments"] if fields["installments"] is not None else "n/a",
+        "image": fields["image"] or "n/a",
+        "_url": url,
+        "_timestamp": now_ts(),
+        "_status": "successed",
+        "_api_cost": cost,
+        "failure_reason": None,
+        **normalize_row(fields["price"], fields["installments"], fields["currency_symbol"]),
+    }
+
+    # 3. Validate
+    if parsed["title"] == "n/a":
+        parsed["_status"] = "failed"
+        parsed["failure_reason"] = classify_page(html)
+    return parsed
+
+def parse_product(url, response, discard_phrase=DISCARD_PHRASE):
+    """Parse a Scrapfly response into a result row."""
+    return parse_html(url, response.content, api_cost(response), discard_phrase)
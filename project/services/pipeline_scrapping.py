@@ -1,13 +1,192 @@
-from project.services.first_scrapp import scrap_meli_urls   
-from project.services.second_scrapp import scrap_urls_failed    
-from project.services.json_merge import merge_scraping
-from project.services.budget import remain_budget
+from project.services.first_scrapp import scrape_all, plan_run, deferred_row, RESULTS_NDJSON
+from project.services.second_scrapp import rescue
+from project.services.blocking import FINAL_REASONS
+from project.services.json_merge import ScrapMerger
+from project.services.result_store import NdjsonWriter, read_ndjson
+from project.services.fetch_tiers import load_profiles, save_profiles
+from project.services.budget import remain_budget, remaining_credits
+from project.services.credit_plan import plan_credits, CreditLedger
+from project.services.canonical import fan_out, covers, saved_requests
+from project.services.html_archive import HtmlArchive, prune
+from project.services.run_context import RunContext
+from project.services.metrics import start_run, write_summary
+from project.services.snapshots import write_snapshot
+from project.services.prices import normalize_records
+from project.services.diff import diff
+from project.services.shards import write_part, done_parts, read_parts, claim, release, run_dir
 from project.services.notification import enviar_mensaje_whapi
+from project.database.db_manager import load_scrap
+from project.settings.config import RESCUE_CONCURRENCY, PIPELINE_ARTIFACTS, HTML_ARCHIVE, SNAPSHOTS
+from project.utils.logger import logger
+import os, json, asyncio
 
-def scrapping():
-    enviar_mensaje_whapi("comenzando scrapping")
-    scrap_meli_urls()
-    scrap_urls_failed()
+# ──────────────────────────────────────────────────────────────────────────────
+# PIPELINE: first pass -> rescue -> merge, connected in memory
+# ──────────────────────────────────────────────────────────────────────────────
+async def run_pipeline(ctx, urls, deferred, writer, merger):
+    """
+    Scrape urls with the first pass while rescue workers pick up every failure
+    as soon as it happens (and the deferred URLs right away). Every row, from
+    either stage, is appended to writer and folded into merger on arrival.
+    Both stages run on ctx (a RunContext): one client, one circuit breaker, so
+    a block wave pauses all of them, and one credit ledger. Rendered pages go
+    to its archive and every row to its metrics when set.
+    """
+    sem = asyncio.Semaphore(RESCUE_CONCURRENCY)
+    tasks = []
+
+    def observe(row):
+        merger.add(row)
+        if ctx.metrics is not None:
+            ctx.metrics.observe(row)
+
+    def on_row(row):
+        row["_run_id"] = ctx.run_id
+        writer.write(row)
+        observe(row)
+
+    async def rescue_job(url):
+        await rescue(ctx, sem, url, on_row)
+        ctx.rescued += 1
+        ctx.progress("rescue", ctx.rescued, len(tasks))
+
+    def dispatch(url):
+        tasks.append(asyncio.create_task(rescue_job(url)))
+
+    def on_first_pass_row(row):
+        observe(row)
+        if row["_status"] == "failed" and row["failure_reason"] not in FINAL_REASONS:
+            dispatch(row["_url"])
+
+    for url, tier in deferred.items():
+        row = deferred_row(url, tier, ctx.run_id)
+        writer.write(row)
+        merger.add(row)
+        dispatch(url)
+
+    await scrape_all(ctx, urls, writer, on_row=on_first_pass_row)
+    # every failure is dispatched by now; wait for the ladders still running
+    await asyncio.gather(*tasks)
+    logger.info(f"Rescue: {len(tasks)} URLs escalated.")
+    logger.info(f"Circuit breaker: {ctx.breaker.snapshot()}")
+
+
+def publish(run_id, records, header, footer=(), out_dir=None, complete=False):
+    """
+    Load the merged records of a run: Parquet snapshot, diff against the
+    stored state, load_scrap of what moved, and the WhatsApp message (header
+    lines, the changes, footer lines). Artifacts go to out_dir when set.
+    complete: the records cover the whole catalog (see load_scrap's truncate).
+    """
+    changes = None
+    if out_dir and PIPELINE_ARTIFACTS:
+        with open(os.path.join(out_dir, "merged_results.json"), "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+    if records and SNAPSHOTS:
+        try:
+            write_snapshot(run_id, records)
+        except Exception as e:
+            logger.warning(f"Snapshot of run {run_id} not written: {e}")
+    # the loader and the message only get what moved
+    if records:
+        changes = diff(records)
+        if out_dir and PIPELINE_ARTIFACTS:
+            changes.write(os.path.join(out_dir, "changes.ndjson"))
+        load_scrap(records, changes=changes, complete=complete)
+    else:
+        logger.info("No data to process.")
+    message = list(header) + ([changes.summary()] if changes is not None else []) + list(footer)
+    enviar_mensaje_whapi("\n".join(message))
+
+
+def merge_shards(run_id, n):
+    """
+    Coordinator step of a sharded run: once the n shards of run_id reported
+    done, load their parts as one run. Returns False while shards are
+    missing or when another instance already took the merge.
+    """
+    done = done_parts(run_id, n)
+    if len(done) < n:
+        logger.info(f"Run {run_id}: {len(done)}/{n} shards done, the merge waits for the rest.")
+        return False
+    if not claim(run_id):
+        logger.info(f"Run {run_id}: merge already taken by another instance.")
+        return False
+    try:
+        records = list(read_parts(run_id, n))
+        logger.info(f"Run {run_id}: merging {n} shards, {len(records)} catalog links.")
+        budget_data, credist_left = remain_budget()
+        credits = sum(marker["credits"] for marker in done.values())
+        skipped = sum(marker["skipped"] for marker in done.values())
+        header = [budget_data, f"shards: {n}, creditos usados: {credits:.0f}"]
+        if skipped:
+            header.append(f"URLs fuera de presupuesto: {skipped}")
+        saved = sum(marker["saved_requests"] for marker in done.values())
+        complete = all(marker.get("complete") for marker in done.values())
+        publish(run_id, records, header, [f"requests ahorrados por dedup: {saved}"], run_dir(run_id), complete)
+    except Exception:
+        release(run_id)
+        raise
+    return True
+
+
+def scrapping(resume=False, workdir=None, on_progress=None, shard=None, run_id=None):
+    # each job gets its own working directory; without one the shared
+    # project/database files are used as before
+    results_path = os.path.join(workdir, "scrap_results.ndjson") if workdir else RESULTS_NDJSON
+    summary_path = os.path.join(os.path.dirname(results_path), "run_summary.json")
+
+    # a shard (k, n) scrapes its slice of the catalog under the run id shared
+    # by all of them and leaves its records for the coordinator
+    if shard is None:
+        enviar_mensaje_whapi("comenzando scrapping")
+    elif shard[0] == 0:
+        enviar_mensaje_whapi(f"comenzando scrapping ({shard[1]} shards)")
+    profiles = load_profiles()
+    run_id, urls, deferred, append, groups = plan_run(resume, results_path, profiles, shard, run_id)
+
+    # 0. Fit the run to the credits left, most overdue URLs first; shards split them evenly
+    remaining = remaining_credits()
+    if shard is not None and remaining is not None:
+        remaining /= shard[1]
+    plan = plan_credits(urls, deferred, remaining)
+    ledger = CreditLedger(plan)
+    metrics = start_run(run_id)
+
+    # 1. Rows already recorded for a resumed run go straight to the merger
+    merger = ScrapMerger()
+    if append:
+        for row in read_ndjson(results_path):
+            if row.get("_run_id") == run_id:
+                merger.add(row)
+
+    # 2. Scrape + rescue + incremental merge; the run context (client, executor,
+    # breaker, archive) is released as soon as the scraping is over
+    archive = HtmlArchive(run_id) if HTML_ARCHIVE else None
+    with NdjsonWriter(results_path, append=append) as writer, \
+            RunContext(run_id, profiles, ledger, archive, metrics, on_progress) as ctx:
+        asyncio.run(run_pipeline(ctx, plan.urls, plan.deferred, writer, merger))
+    save_profiles(profiles)
+    write_summary(metrics, summary_path)
+    if HTML_ARCHIVE:
+        prune()
+    logger.info(f"Credits planned vs actual: {ledger.report()}")
+    if on_progress:
+        on_progress("merge", None, None)
+
+    # 3. One record per catalog link, typed prices
+    records = normalize_records(fan_out(merger.records(), groups))
+    logger.info(f"Merged {merger.rows} rows into {len(merger)} URLs, {len(records)} catalog links "
+                f"({merger.not_sent} rows of URLs not sent left out).")
+    if shard is not None:
+        write_part(run_id, shard, records, {"credits": ledger.total, "skipped": len(plan.skipped),
+                                            "saved_requests": saved_requests(groups),
+                                            "complete": covers(records, groups)})
+        merge_shards(run_id, shard[1])
+        return
+
+    # 4. Snapshot, diff and load
     budget_data, credist_left = remain_budget()
-    merge_scraping()
-    enviar_mensaje_whapi(budget_data)
\ No newline at end of file
+    publish(run_id, records, [budget_data, ledger.summary()],
+            [f"requests ahorrados por dedup: {saved_requests(groups)}"], os.path.dirname(results_path),
+            covers(records, groups))
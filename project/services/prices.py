@@ -0,0 +1,163 @@
+"""
+Typed prices: turn the scraped price strings into numeric fields.
+
+    price                  "599.999"                                -> price_cents 59999900
+    price_in_installments  "Mismo precio en 12 cuotas de $49.999"   -> installments_count 12,
+                                                                       installment_cents 4999900,
+                                                                       interest_free True
+    currency symbol        "$" / "US$"                              -> currency "ARS" / "USD"
+
+normalize_row() is the per-row version used by the extractor;
+normalize_records() / normalize_frame() do the same on a whole result set
+(or history table) with vectorized pandas string ops.
+
+    python -m project.services.prices backfill    # fill the typed columns of stored rows
+"""
+from project.utils.logger import logger
+import argparse, re
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+PRICE_FIELDS = ("price_cents", "installments_count", "installment_cents", "interest_free", "currency")
+DEFAULT_CURRENCY = "ARS"
+CURRENCY_SYMBOLS = {"$": "ARS", "US$": "USD", "U$S": "USD"}
+
+# es-AR amounts: "." groups thousands, "," starts the cents ("1.299,50")
+AMOUNT = r"(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d{1,2}))?"
+PRICE_RE = re.compile(AMOUNT)
+# "12 cuotas de $49.999", "12x $ 4.999,50 sin interés"
+INSTALLMENTS_RE = re.compile(r"(\d+)\s*(?:x|cuotas?)\b\D*?(US\$|U\$S|\$)?\s*" + AMOUNT, re.IGNORECASE)
+# "sin interés", "mismo precio en 12 cuotas", "con 0% interés"
+INTEREST_FREE_RE = re.compile(r"sin inter[eé]s|mismo precio|(?<![\d,.])0\s*%\s*(?:de\s+)?inter[eé]s", re.IGNORECASE)
+USD_RE = re.compile(r"US\$|U\$S")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def _cents(whole, decimals):
+    return int(whole.replace(".", "")) * 100 + int((decimals or "0").ljust(2, "0"))
+
+def parse_price(text):
+    """Price string -> integer cents, None when there is no amount."""
+    found = PRICE_RE.search(text or "")
+    return _cents(*found.groups()) if found else None
+
+def parse_installments(text):
+    """Installments string -> (count, amount in cents, interest free); Nones when it has no plan."""
+    found = INSTALLMENTS_RE.search(text or "")
+    if not found:
+        return None, None, None
+    count, _, whole, decimals = found.groups()
+    return int(count), _cents(whole, decimals), bool(INTEREST_FREE_RE.search(text))
+
+def currency_of(symbol, *texts):
+    """ISO currency of a price: its symbol when known, else USD if any text shows US$, else ARS."""
+    symbol = (symbol or "").strip()
+    if symbol in CURRENCY_SYMBOLS:
+        return CURRENCY_SYMBOLS[symbol]
+    if any(t and USD_RE.search(t) for t in texts):
+        return "USD"
+    return DEFAULT_CURRENCY
+
+def empty_prices():
+    return dict.fromkeys(PRICE_FIELDS)
+
+def _cents_column(whole, decimals):
+    import pandas as pd
+
+    whole = pd.to_numeric(whole.str.replace(".", "", regex=False), errors="coerce")
+    decimals = pd.to_numeric(decimals.str.ljust(2, "0"), errors="coerce").fillna(0)
+    return (whole * 100 + decimals).round().astype("Int64")
+
+def _price_columns(texts):
+    amount = texts.str.extract(PRICE_RE)
+    return _cents_column(amount[0], amount[1]).to_frame("price_cents")
+
+def _plan_columns(texts):
+    import pandas as pd
+
+    plan = texts.str.extract(INSTALLMENTS_RE)
+    return pd.DataFrame({
+        "installments_count": pd.to_numeric(plan[0], errors="coerce").astype("Int64"),
+        "installment_cents": _cents_column(plan[2], plan[3]),
+        "interest_free": texts.str.contains(INTEREST_FREE_RE, na=False).astype("boolean").where(plan[0].notna()),
+        "usd": texts.str.contains(USD_RE, na=False).astype("boolean"),
+    })
+
+def _per_distinct(series, parse):
+    """parse() (str Series -> DataFrame) run once per distinct string, then spread back to every row."""
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series)
+    parsed = parse(pd.Series(uniques, dtype="string"))
+    return parsed.reindex(codes).set_axis(series.index)  # code -1 (missing) -> all-NA row
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+def normalize_row(price, installments, symbol=None):
+    """Typed price fields of one scraped row."""
+    cents = parse_price(price)
+    count, amount, interest_free = parse_installments(installments)
+    return {
+        "price_cents": cents,
+        "installments_count": count,
+        "installment_cents": amount,
+        "interest_free": interest_free,
+        "currency": currency_of(symbol, installments) if cents is not None else None,
+    }
+
+def normalize_frame(df, price="price", installments="price_in_installments"):
+    """
+    Add the typed price columns to a DataFrame of scraped rows. The string
+    columns are parsed once per distinct value, with vectorized str ops, and
+    spread back by factorize codes. Matches normalize_row() row by row; a
+    "currency" column already present (set by the extractor) is kept where
+    not null.
+    """
+    import pandas as pd
+
+    amount = _per_distinct(df[price], _price_columns)
+    plan = _per_distinct(df[installments], _plan_columns)
+
+    out = df.copy()
+    out["price_cents"] = amount["price_cents"]
+    for column in ("installments_count", "installment_cents", "interest_free"):
+        out[column] = plan[column]
+
+    currency = pd.Series(DEFAULT_CURRENCY, index=df.index, dtype="string")
+    currency = currency.mask(plan["usd"].fillna(False), "USD")
+    if "currency" in df.columns:
+        currency = df["currency"].astype("string").fillna(currency)
+    out["currency"] = currency.where(out["price_cents"].notna())
+    return out
+
+def normalize_records(records, price="price", installments="price_in_installments"):
+    """normalize_frame() over a list of dicts; returns new dicts with plain Python values."""
+    if not records:
+        return []
+    import pandas as pd
+
+    names = [price, installments] + (["currency"] if any("currency" in r for r in records) else [])
+    frame = normalize_frame(pd.DataFrame({n: [r.get(n) for r in records] for n in names}), price, installments)
+    columns = []
+    for field in PRICE_FIELDS:
+        column = frame[field].astype(object)
+        columns.append(column.where(column.notna(), None).tolist())
+    return [{**record, **dict(zip(PRICE_FIELDS, values))} for record, values in zip(records, zip(*columns))]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("command", choices=["backfill"])
+    args = ap.parse_args()
+
+    if args.command == "backfill":
+        from project.database.db_manager import backfill_prices
+        logger.info(f"Typed prices backfilled: {backfill_prices()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Re-run the current extractor over an archived run, offline.
+
+    python -m project.services.reparse <run_id> [--out path] [--workers n]
+
+Every page archived for the run is parsed again with pdp_parser in a pool of
+worker processes and written, as a fresh results file, in the same row
+format the scrapers produce. Scrapfly is not called.
+"""
+from project.services.html_archive import ARCHIVE_DIR, read_index, read_blob, archived_runs
+from project.services.pdp_parser import parse_html
+from project.services.result_store import NdjsonWriter
+from project.utils.logger import logger
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+import argparse, os, time
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PATHS / CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(__file__)
+DATABASE_DIR = os.path.join(BASE_DIR, "../database")
+CHUNK = 16
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+def parse_entry(root, run_id, entry):
+    """Row for one archived page, as the scraper would have written it."""
+    row = parse_html(entry["url"], read_blob(root, entry["sha"]), entry["cost"])
+    row["_timestamp"] = entry["timestamp"]
+    row["_run_id"] = run_id
+    row["_html_sha"] = entry["sha"]
+    if entry["stage"] != "first_pass":
+        row["retry_stage"] = entry["stage"]
+    return row
+
+def _parse_chunk(args):
+    root, run_id, entries = args
+    return [parse_entry(root, run_id, entry) for entry in entries]
+
+def reparse(run_id, output_path=None, workers=None, root=ARCHIVE_DIR):
+    """Parse every page archived for run_id into output_path; returns rows per status."""
+    output_path = output_path or os.path.join(DATABASE_DIR, f"reparsed_{run_id}.ndjson")
+    entries = list(read_index(run_id, root))
+    if not entries:
+        raise ValueError(f"no archived pages for run {run_id!r} in {root}")
+
+    chunks = [(root, run_id, entries[i:i + CHUNK]) for i in range(0, len(entries), CHUNK)]
+    counts = Counter()
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool, \
+            NdjsonWriter(output_path) as writer:
+        for rows in pool.map(_parse_chunk, chunks):
+            for row in rows:
+                writer.write(row)
+                counts[row["_status"]] += 1
+    elapsed = time.perf_counter() - start
+    logger.info(f"Reparsed {len(entries)} pages of run {run_id} in {elapsed:.1f}s "
+                f"({len(entries) / elapsed:.0f} pages/s): {dict(counts)} -> {output_path}")
+    return counts
+
+# ──────────────────────────────────────────────────────────────────────────────
+# MAIN
+# ──────────────────────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("run_id", nargs="?", help="archived run (default: the latest)")
+    ap.add_argument("--out", help="results file (default: database/reparsed_<run_id>.ndjson)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--root", default=ARCHIVE_DIR)
+    args = ap.parse_args()
+
+    run_id = args.run_id or (archived_runs(args.root) or [None])[-1]
+    if run_id is None:
+        ap.error(f"no archived runs in {args.root}")
+    reparse(run_id, args.out, args.workers, args.root)
+
+if __name__ == "__main__":
+    main()
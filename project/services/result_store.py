@@ -0,0 +1,92 @@
+from project.utils.logger import logger
+from datetime import datetime
+import os, json, uuid
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+DONE_STATUS = ("successed", "discarded")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def new_run_id():
+    """Sortable, unique id for a scraping run."""
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+def _repair_tail(path):
+    """Drop a half-written last line left behind by a crash."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        data = f.read()
+        cut = data.rfind(b"\n") + 1
+        f.truncate(cut)
+        logger.warning(f"Dropped {len(data) - cut} bytes of a partial row in {os.path.basename(path)}.")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# WRITER / READER
+# ──────────────────────────────────────────────────────────────────────────────
+class NdjsonWriter:
+    """
+    Line-delimited JSON writer. Every row is flushed and fsynced as soon as it
+    is written, so a crash loses at most the rows still in flight.
+    """
+
+    def __init__(self, path, append=False):
+        if append:
+            _repair_tail(path)
+        self.path = path
+        self._f = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, row):
+        self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_ndjson(path):
+    """Yield rows one at a time; a missing file yields nothing."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping unreadable row in {os.path.basename(path)}.")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CHECKPOINT
+# ──────────────────────────────────────────────────────────────────────────────
+def load_checkpoint(path):
+    """
+    Return (run_id, done_urls) for the last run recorded in path.
+    done_urls are the URLs whose latest row is successed or discarded.
+    run_id is None when there is nothing to resume.
+    """
+    run_id = None
+    last_status = {}
+    for row in read_ndjson(path):
+        if row.get("_run_id") != run_id:
+            run_id = row.get("_run_id")
+            last_status = {}
+        last_status[row["_url"]] = row.get("_status")
+    done = {url for url, status in last_status.items() if status in DONE_STATUS}
+    return run_id, done
@@ -0,0 +1,68 @@
+from project.settings.config import SCRAPE_CONCURRENCY_MAX, RESCUE_CONCURRENCY
+from project.services.scrapfly_client import new_client
+from project.services.blocking import CircuitBreaker
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+class RunContext:
+    """
+    Everything one scraping run owns: the Scrapfly client and the executor
+    its async_scrape runs in, the circuit breaker shared by both stages, the
+    credit ledger, HTML archive, metrics and fetch profiles, and the per-run
+    counters. The scrapers take it instead of module-level state; close()
+    (or leaving the with block) releases it, so a long-lived worker keeps
+    nothing from one run to the next.
+    """
+
+    def __init__(self, run_id, profiles=None, ledger=None, archive=None, metrics=None, on_progress=None,
+                 workers=SCRAPE_CONCURRENCY_MAX + RESCUE_CONCURRENCY):
+        self.run_id = run_id
+        self.profiles = profiles
+        self.ledger = ledger
+        self.archive = archive
+        self.metrics = metrics
+        self.on_progress = on_progress
+        self.breaker = CircuitBreaker()
+        self.counts = Counter()      # rows per (stage, status)
+        self.reasons = Counter()     # failed rows per (stage, reason)
+        self.rescued = 0
+        # async_scrape runs in the client's executor: one per run, sized for both stages
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"scrape-{run_id}")
+        self.client = new_client()
+        self.client.async_executor = self._executor
+
+    def count(self, row):
+        stage = row.get("retry_stage") or "first_pass"
+        self.counts[(stage, row["_status"])] += 1
+        if row.get("failure_reason"):
+            self.reasons[(stage, row["failure_reason"])] += 1
+
+    def stage_counts(self, stage, counter=None):
+        """{status: rows} (or {reason: rows} from self.reasons) of one stage."""
+        return {key: n for (s, key), n in (counter if counter is not None else self.counts).items() if s == stage}
+
+    def progress(self, phase, done, total):
+        if self.on_progress:
+            self.on_progress(phase, done, total)
+
+    def close(self):
+        """Stop the executor threads, close the client's HTTP session and the archive."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        session = getattr(self.client, "http_session", None)
+        if session is not None:
+            session.close()
+            self.client.http_session = None
+        if self.archive is not None:
+            self.archive.close()
+        self.client = self.archive = self.ledger = self.metrics = self.profiles = self.on_progress = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
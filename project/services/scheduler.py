@@ -0,0 +1,107 @@
+from project.settings.config import (
+    SCHEDULE_ENABLED, SCHEDULE_MIN_AGE_HOURS, SCHEDULE_MAX_AGE_HOURS, SCHEDULE_HISTORY_DAYS,
+)
+from project.utils.logger import logger
+from datetime import datetime
+import math, time
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+SAMPLES_PER_CHANGE = 2   # scrape twice per expected change interval
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def _epoch(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+def last_scraped(url, profiles, stats):
+    """Most recent of the last definitive scrape (fetch profile) and last_scraped_at in the DB."""
+    seen = [profiles.get(url, {}).get("updated"), _epoch((stats.get(url) or {}).get("last_scraped"))]
+    seen = [t for t in seen if t]
+    return max(seen) if seen else None
+
+def interval_hours(stat, now, history_days=SCHEDULE_HISTORY_DAYS,
+                   min_hours=SCHEDULE_MIN_AGE_HOURS, max_hours=SCHEDULE_MAX_AGE_HOURS):
+    """
+    Hours a URL can go without a scrape: half its observed time between
+    changes, stretched by its share of discarded results, kept within
+    [min_hours, max_hours]. Without changes it is max_hours, once its
+    history covers the whole window; until then it is min_hours (due on
+    every trigger), so the rows loaded before the history existed are not
+    taken for stable ones.
+    """
+    window = history_days * 24
+    first = _epoch((stat or {}).get("first_seen"))
+    if not stat or not stat["changes"]:
+        covered = first is not None and (now - first) / 3600 >= window
+        return max_hours if covered else min_hours
+    observed = min(window, (now - first) / 3600) if first else window
+    hours_per_change = max(observed, 1) / stat["changes"]
+    discard_share = stat["discarded"] / stat["changes"]
+    hours = hours_per_change / SAMPLES_PER_CHANGE * (1 + discard_share)
+    return min(max(hours, min_hours), max_hours)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+def rank(urls, profiles, stats, now=None):
+    """
+    url -> overdue score (hours since the last scrape / allowed interval).
+    A score >= 1 means the URL is due; never scraped URLs score inf.
+    """
+    now = now or time.time()
+    scores = {}
+    for url in urls:
+        last = last_scraped(url, profiles, stats)
+        if last is None:
+            scores[url] = math.inf
+            continue
+        interval = interval_hours(stats.get(url), now)
+        age = (now - last) / 3600
+        scores[url] = math.inf if interval <= 0 else age / interval
+    return scores
+
+def group_stats(stats, groups):
+    """Stats per scrape target: the most volatile of its catalog links, with the latest scrape."""
+    grouped = {}
+    for target, links in groups.items():
+        found = [stats[link] for link in links if link in stats]
+        if not found:
+            continue
+        stat = dict(max(found, key=lambda s: s["changes"]))
+        scraped = [s["last_scraped"] for s in found if s.get("last_scraped")]
+        stat["last_scraped"] = max(scraped) if scraped else None
+        grouped[target] = stat
+    return grouped
+
+def schedule(urls, profiles, stats=None, now=None, groups=None):
+    """
+    URLs to scrape this run, most overdue first. With SCHEDULE_ENABLED off,
+    or without history, every URL is scraped, stalest first. groups
+    (target -> catalog links, see canonical.dedupe) maps the DB history,
+    kept per catalog link, onto the deduplicated targets.
+    """
+    if not SCHEDULE_ENABLED:
+        return sorted(urls, key=lambda u: profiles.get(u, {}).get("updated", 0))
+    if stats is None:
+        try:
+            from project.database.db_manager import get_change_stats
+            stats = get_change_stats(SCHEDULE_HISTORY_DAYS)
+        except Exception:
+            logger.exception("Could not read the price history, scraping every URL.")
+            stats = {}
+    if groups:
+        stats = group_stats(stats, groups)
+
+    scores = rank(urls, profiles, stats, now)
+    due = sorted((u for u in urls if scores[u] >= 1), key=lambda u: scores[u], reverse=True)
+    new = sum(1 for u in due if scores[u] == math.inf)
+    logger.info(f"Scheduler: {len(due)} of {len(urls)} URLs due ({new} never scraped or without enough history, "
+                f"{len(urls) - len(due)} still fresh, max age {SCHEDULE_MAX_AGE_HOURS:.0f}h).")
+    return due
@@ -0,0 +1,29 @@
+from project.settings.config import SCRAP_KEY, SCRAPFLY_FAKE
+import requests
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLIENT FACTORY: the scrapers get their Scrapfly client (and the account
+# data) from here, so a run can be pointed at the offline fake
+# ──────────────────────────────────────────────────────────────────────────────
+_override = None
+
+def use_client(client):
+    """Serve `client` (e.g. a FakeScrapflyClient) to every scraper; None goes back to Scrapfly."""
+    global _override
+    _override = client
+
+def new_client():
+    if _override is None and SCRAPFLY_FAKE:
+        from project.services.fake_scrapfly import FakeScrapflyClient
+        use_client(FakeScrapflyClient(SCRAPFLY_FAKE))
+    if _override is not None:
+        return _override
+    from scrapfly import ScrapflyClient
+    return ScrapflyClient(key=SCRAP_KEY)
+
+def get_account():
+    if _override is not None or SCRAPFLY_FAKE:
+        return new_client().account()
+    url = f"https://api.scrapfly.io/account?key={SCRAP_KEY}"
+    response = requests.get(url, timeout=30)
+    return response.json()
@@ -1,142 +1,61 @@
-from scrapfly import ScrapflyClient, ScrapeConfig, ScrapflyScrapeError
-from project.settings.config import SCRAP_KEY
+from scrapfly import ScrapeConfig, ScrapflyScrapeError
+from project.services.pdp_parser import parse_product, empty_row
+from project.services.blocking import classify_error, FINAL_REASONS
+from project.services.fetch_tiers import start_tier, record
 from project.utils.logger import logger
-from datetime import datetime
-from bs4 import BeautifulSoup
-import os, json, uuid, time
+import uuid, asyncio, time
 
 # ──────────────────────────────────────────────────────────────────────────────
-# PATHS / CONSTANTS / VARIABLES
+# CONSTANTS
 # ──────────────────────────────────────────────────────────────────────────────
-BASE_DIR = os.path.dirname(__file__)
-DATABASE_DIR = os.path.join(BASE_DIR, '../database')
-FAILED_JSON_PATH = os.path.join(DATABASE_DIR, 'scrap_results.json')
-OUTPUT_JSON_PATH = os.path.join(DATABASE_DIR, 'scrapping_failed_urls.json')
-DISCARD_PHRASE = "Este producto no está disponible. Elige otra variante."
-scrapped_results = []
-
-# ──────────────────────────────────────────────────────────────────────────────
-# HELPERS
-# ──────────────────────────────────────────────────────────────────────────────
-def now_ts():
-    return datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-
-def write_results(rows):
-    with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
-
-def read_failed():
-    with open(FAILED_JSON_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    # Return only failed URLs
-    return [row["_url"] for row in data if row.get("_status", "").lower() == "failed"]
-
-def api_cost(response):
-    return getattr(getattr(response, "response", None), "headers", {}).get("X-Scrapfly-Api-Cost", "n/a")
-
-def parse_product(url, response):
-    html = response.content
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Check availability
-    msg_el = soup.find(class_="ui-pdp-shipping-message__text")
-    if msg_el and DISCARD_PHRASE in msg_el.get_text(strip=True):
-        parsed = {
-            "title": "n/a",
-            "price": "",
-            "competitor": "n/a",
-            "price_in_installments": "n/a",
-            "image": "n/a",
-            "_url": url,
-            "_timestamp": now_ts(),
-            "_status": "discarded",
-            "_api_cost": api_cost(response)
-        }
-        logger.warning(f"Discarded (not available)..")
-        return parsed
-
-    # Extract fields
-    t = soup.find("h1", class_="ui-pdp-title")
-    precio_container = soup.find("div", {"class": "ui-pdp-price__second-line"})
-    p = precio_container.find("span", {"class": "andes-money-amount__fraction"}) if precio_container else None
-    c = soup.find("h2", class_="ui-seller-data-header__title")
-    q = soup.find("div", class_="ui-pdp-price__subtitles")
-    img = soup.find("img", class_="ui-pdp-image")
-    parsed = {
-        "title": (t.text.strip() if t else "n/a"),
-        "price": (p.text.strip() if p else ""),
-        "competitor": (c.text.strip() if c else "n/a"),
-        "price_in_installments": (q.text.strip() if q else "n/a"),
-        "image": (img["src"] if (img and img.get("src")) else "n/a"),
-        "_url": url,
-        "_timestamp": now_ts(),
-        "_status": "successed",
-        "_api_cost": api_cost(response),
-    }
-
-    if parsed["title"] == "n/a":
-        parsed["_status"] = "failed"
-        logger.error(f"Failed to parse title.")
-    else:
-        logger.info(f"Successed retry..")
-    
-    return parsed
+RESCUE_PAUSE = 0.8  # seconds between URLs on the same worker slot
 
 # ──────────────────────────────────────────────────────────────────────────────
 # ATTEMPT HELPER
 # ──────────────────────────────────────────────────────────────────────────────
-def scrape_attempt(client, url, config, stage):
+async def scrape_attempt(client, url, config, stage, archive=None):
+    started = time.monotonic()
     try:
         # Remove timeout if retry=True
         if config.get("retry", False):
             config.pop("timeout", None)
-        response = client.scrape(ScrapeConfig(url=url, **config))
+        response = await client.async_scrape(ScrapeConfig(url=url, **config))
+        fetched = time.monotonic()
         parsed = parse_product(url, response)
+        parsed["_fetch_s"] = round(fetched - started, 3)
+        parsed["_parse_s"] = round(time.monotonic() - fetched, 4)
+        if archive is not None:
+            await archive.store(parsed, response.content, stage)
+        if parsed["_status"] == "discarded":
+            logger.warning(f"Discarded (not available)..")
+        elif parsed["_status"] == "failed":
+            logger.error(f"Failed to parse title ({parsed['failure_reason']}).")
+        else:
+            logger.info(f"Successed retry..")
         parsed["retry_stage"] = stage
-        parsed["failure_reason"] = None if parsed["_status"] in ["successed", "discarded"] else "parse_failed"
-        scrapped_results.append(parsed)
         return parsed
 
     except ScrapflyScrapeError as e:
-        logger.error("SCRAPFLY ERROR..")
-        parsed = {
-            "title": "n/a",
-            "price": "",
-            "competitor": "n/a",
-            "price_in_installments": "n/a",
-            "image": "n/a",
-            "_url": url,
-            "_timestamp": now_ts(),
-            "_status": "SCRAPFLY ERROR",
-            "_api_cost": "n/a",
-            "retry_stage": stage,
-            "failure_reason": getattr(e, "error_code", "") or type(e).__name__,
-        }
-        scrapped_results.append(parsed)
+        logger.error(f"SCRAPFLY ERROR: {e}")
+        parsed = empty_row(url, "SCRAPFLY ERROR", reason=classify_error(e))
+        parsed["retry_stage"] = stage
+        parsed["error_code"] = getattr(e, "code", "") or type(e).__name__
+        parsed["_fetch_s"] = round(time.monotonic() - started, 3)
         return parsed
 
     except Exception as e:
         logger.error("UNEXPECTED ERROR..")
-        parsed = {
-            "title": "n/a",
-            "price": "",
-            "competitor": "n/a",
-            "price_in_installments": "n/a",
-            "image": "n/a",
-            "_url": url,
-            "_timestamp": now_ts(),
-            "_status": "UNEXPECTED ERROR",
-            "_api_cost": "n/a",
-            "retry_stage": stage,
-            "failure_reason": f"UNEXPECTED {type(e).__name__}",
-        }
-        scrapped_results.append(parsed)
+        parsed = empty_row(url, "UNEXPECTED ERROR", reason=classify_error(e))
+        parsed["retry_stage"] = stage
+        parsed["error_code"] = f"UNEXPECTED {type(e).__name__}"
+        parsed["_fetch_s"] = round(time.monotonic() - started, 3)
         return parsed
 
 # ──────────────────────────────────────────────────────────────────────────────
 # CORE: scrape a single failed URL
 # ──────────────────────────────────────────────────────────────────────────────
-def scrape_one(client, session_id, url):
+def build_stages(session_id):
+    """Escalation ladder for one URL, from the lightest to the heaviest config."""
     base = dict(
         asp=True,
         render_js=True,
@@ -149,7 +68,7 @@ def scrape_one(client, session_id, url):
         session=session_id,
     )
 
-    stages = [
+    return [
         ("first_attempt", base.copy()),
         ("second_attempt", {**base, "rendering_wait": 10_000, "auto_scroll": True}),
         ("heavy_retry", {**base, "rendering_wait": 12_000, "auto_scroll": True, "session": f"HEAVY-{uuid.uuid4()}"}),
@@ -157,34 +76,57 @@ def scrape_one(client, session_id, url):
         ("deep_rescue", {**base, "rendering_wait": 15_000, "wait_for_selector": None, "proxy_pool": "public_residential_pool", "session": f"DEEP-{uuid.uuid4()}"})
     ]
 
-    for stage_name, cfg in stages:
+async def scrape_one(ctx, url, on_row=None, queued=None):
+    # stages run in order for this URL; the session is per URL so concurrent
+    # URLs never share a sticky browser session
+    stages = build_stages(f"FAILED-{uuid.uuid4()}")
+    breaker, ledger, profiles = ctx.breaker, ctx.ledger, ctx.profiles
+    # _queue_s: wait for a rescue slot (queued) or for the breaker before each attempt
+    waiting = queued or time.monotonic()
+    # known-hard URLs start at the stage that last worked for them
+    start = max(1, start_tier(profiles, url)) if profiles is not None else 1
+
+    def finish(out):
+        ctx.count(out)
+        if on_row:
+            on_row(out)
+
+    for stage_name, cfg in stages[start - 1:]:
+        # budget first: a half-open probe handed out by wait() must be sent and recorded
+        if ledger is not None and not ledger.reserve(stage_name):
+            out = empty_row(url, "failed", 0, "budget")
+            out["retry_stage"] = stage_name
+            finish(out)
+            return
+        if not await breaker.wait():
+            if ledger is not None:
+                ledger.release(stage_name)
+            out = empty_row(url, "failed", 0, "circuit_open")
+            out["retry_stage"] = stage_name
+            finish(out)
+            return
         logger.info(f"{stage_name}..")
-        out = scrape_attempt(client, url, cfg, stage_name)
+        started = time.monotonic()
+        out = await scrape_attempt(ctx.client, url, cfg, stage_name, ctx.archive)
+        out["_queue_s"] = round(started - waiting, 3)
+        waiting = time.monotonic()
+        if ledger is not None:
+            ledger.charge(stage_name, out["_api_cost"])
+        await breaker.record(out["failure_reason"])
+        finish(out)
         if out["_status"] in ["successed", "discarded"]:
+            if profiles is not None:
+                record(profiles, url, stage_name, out["_status"], out["_api_cost"], time.monotonic() - started)
+            return
+        # a missing page stays missing on heavier configs
+        if out["failure_reason"] in FINAL_REASONS:
+            logger.info(f"Not escalating ({out['failure_reason']})..")
             return
     logger.info(f"All retries failed..")
 
-# ──────────────────────────────────────────────────────────────────────────────
-# ORCHESTRATOR
-# ──────────────────────────────────────────────────────────────────────────────
-def scrape_all_failed(urls):
-    client = ScrapflyClient(key=SCRAP_KEY)
-    session_id = f"FAILED-{uuid.uuid4()}"
-    logger.info(f"Retrying {len(urls)} failed URLs..")
-    for url in urls:
-        scrape_one(client, session_id, url)
-        time.sleep(0.8)
-    return scrapped_results
-
-# ──────────────────────────────────────────────────────────────────────────────
-# MAIN ENTRY
-# ──────────────────────────────────────────────────────────────────────────────
-def scrap_urls_failed():
-    logger.info("START - Second Scrapping Method.")
-    failed_urls = read_failed()
-    if not failed_urls:
-        logger.info("END - Not failed URLs found.")
-        return
-    results = scrape_all_failed(failed_urls)
-    write_results(results)
-    logger.info("END - Second Scrapping Method.")
+async def rescue(ctx, sem, url, on_row=None):
+    """Run the ladder for one URL inside a rescue slot, then pause."""
+    queued = time.monotonic()
+    async with sem:
+        await scrape_one(ctx, url, on_row, queued)
+        await asyncio.sleep(RESCUE_PAUSE)
@@ -0,0 +1,180 @@
+"""
+Horizontal sharding of a run: n worker instances each scrape one slice of
+the catalog (CRC32(catalog_link) % n == k, see db_manager.iter_urls) under a
+shared run id and leave their merged records here instead of loading them.
+The shard that completes the set merges every part into a single load
+(pipeline_scrapping.merge_shards).
+
+    <SHARD_DIR>/<run_id>/part-0-of-4.ndjson      merged records of shard 0
+    <SHARD_DIR>/<run_id>/part-0-of-4.done.json   written last: shard 0 is done
+    <SHARD_DIR>/<run_id>/merge.lock              taken by the instance that loads the run
+
+SHARD_DIR has to be storage every instance sees (a mounted bucket or volume).
+
+    python -m project.services.shards status <run_id> <n>
+    python -m project.services.shards merge <run_id> <n>
+"""
+from project.settings.config import SHARD_DIR, SHARD_WORKER_URL, SECRET_GUIAS
+from project.services.result_store import read_ndjson
+from project.utils.logger import logger
+from datetime import datetime
+import argparse, os, json
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PATHS / CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(__file__)
+SHARDS_DIR = SHARD_DIR or os.path.join(BASE_DIR, "../database/shards")
+DISPATCH_TIMEOUT = 15
+
+# ──────────────────────────────────────────────────────────────────────────────
+# SHARD SPEC
+# ──────────────────────────────────────────────────────────────────────────────
+def parse_shard(spec):
+    """
+    Shard spec -> (k, n), None for no spec. Accepts "k/n", [k, n] or
+    {"index": k, "count": n}; k is 0-based. Raises ValueError when invalid.
+    """
+    if spec is None or spec == "":
+        return None
+    try:
+        if isinstance(spec, str):
+            k, n = spec.split("/")
+        elif isinstance(spec, dict):
+            k, n = spec["index"], spec["count"]
+        else:
+            k, n = spec
+        k, n = int(k), int(n)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"invalid shard spec {spec!r}, expected 'k/n'")
+    if n < 1 or not 0 <= k < n:
+        raise ValueError(f"invalid shard {k}/{n}: need 0 <= k < n")
+    return k, n
+
+def parse_shard_count(value):
+    """Shard count of a fan-out, 0 for none. Raises ValueError when it is not a whole number >= 0."""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, bool) or not str(value).strip().isdigit():
+        raise ValueError(f"invalid shard count {value!r}, expected a whole number")
+    return int(value)
+
+def part_name(shard):
+    return f"part-{shard[0]}-of-{shard[1]}"
+
+def run_dir(run_id, root=SHARDS_DIR):
+    return os.path.join(root, run_id)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PARTS
+# ──────────────────────────────────────────────────────────────────────────────
+def write_part(run_id, shard, records, info=None, root=SHARDS_DIR):
+    """
+    Store the merged records of one shard, then its done marker with `info`
+    (counts, credits) for the coordinator. Both are written to a temp file
+    and renamed, so a part is either complete or absent. Returns the marker.
+    """
+    folder = run_dir(run_id, root)
+    os.makedirs(folder, exist_ok=True)
+    base = os.path.join(folder, part_name(shard))
+    with open(f"{base}.ndjson.tmp", "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(f"{base}.ndjson.tmp", f"{base}.ndjson")
+
+    marker = {**(info or {}), "run_id": run_id, "shard": list(shard), "records": len(records),
+              "finished_at": datetime.now().strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(f"{base}.done.json.tmp", "w", encoding="utf-8") as f:
+        json.dump(marker, f)
+    os.replace(f"{base}.done.json.tmp", f"{base}.done.json")
+    logger.info(f"Shard {shard[0]}/{shard[1]} of run {run_id}: {len(records)} records -> {base}.ndjson")
+    return marker
+
+def done_parts(run_id, n, root=SHARDS_DIR):
+    """{k: done marker} of the shards of run_id that reported done."""
+    done = {}
+    for k in range(n):
+        path = os.path.join(run_dir(run_id, root), f"{part_name((k, n))}.done.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                done[k] = json.load(f)
+    return done
+
+def read_parts(run_id, n, root=SHARDS_DIR):
+    """Yield the records of every shard, shard 0 first."""
+    for k in range(n):
+        yield from read_ndjson(os.path.join(run_dir(run_id, root), f"{part_name((k, n))}.ndjson"))
+
+def claim(run_id, root=SHARDS_DIR):
+    """Take the merge of run_id; False when another instance already has it."""
+    try:
+        fd = os.open(os.path.join(run_dir(run_id, root), "merge.lock"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(datetime.now().strftime("%Y-%m-%dT%H:%M:%S"))
+    return True
+
+def release(run_id, root=SHARDS_DIR):
+    """Give the merge back (it failed), so it can be retried."""
+    try:
+        os.remove(os.path.join(run_dir(run_id, root), "merge.lock"))
+    except FileNotFoundError:
+        pass
+
+# ──────────────────────────────────────────────────────────────────────────────
+# FAN-OUT
+# ──────────────────────────────────────────────────────────────────────────────
+def dispatch(run_id, n, submit, url=SHARD_WORKER_URL):
+    """
+    Start the n shards of run_id. With a worker url every shard is posted to
+    it (behind a load balancer each lands on whichever instance is free);
+    otherwise they go to submit(shard=..., run_id=...), this process' queue.
+    Returns one {"shard", "status", "ok"} per shard; ok is False for a shard
+    that was not started, which leaves the run without its merge.
+    """
+    out = []
+    for k in range(n):
+        shard = f"{k}/{n}"
+        if not url:
+            job, accepted = submit(shard=(k, n), run_id=run_id)
+            out.append({"shard": shard, "status": "accepted" if accepted else "coalesced", "job": job.id,
+                        "ok": accepted})
+            continue
+        import requests
+
+        try:
+            res = requests.post(url, json={"secret": SECRET_GUIAS, "run_id": run_id, "shard": shard},
+                                timeout=DISPATCH_TIMEOUT)
+            body = res.json() if res.headers.get("content-type", "").startswith("application/json") else {}
+            ok = res.status_code == 202 and body.get("status") == "accepted"
+            out.append({"shard": shard, "status": body.get("status", res.status_code), "ok": ok})
+        except requests.RequestException as e:
+            out.append({"shard": shard, "status": "error", "error": str(e), "ok": False})
+        if not out[-1]["ok"]:
+            logger.error(f"Shard {shard} of run {run_id} not started: {out[-1]}")
+    return out
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("command", choices=("status", "merge"))
+    ap.add_argument("run_id")
+    ap.add_argument("n", type=int, help="shard count of the run")
+    args = ap.parse_args()
+
+    if args.command == "status":
+        done = done_parts(args.run_id, args.n)
+        for k in range(args.n):
+            marker = done.get(k)
+            print(f"{part_name((k, args.n))}: " + (f"done {marker['finished_at']}, {marker['records']} records"
+                                                 if marker else "pending"))
+    else:
+        from project.services.pipeline_scrapping import merge_shards
+        if not merge_shards(args.run_id, args.n):
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Columnar run snapshots: every merged run as a compressed Parquet file,
+hive-partitioned by date and run id, plus a small query API over all of them.
+
+    <SNAPSHOT_DIR>/date=2026-10-17/run_id=20261017T030000-ab12cd/part-0.parquet
+
+Queries read only the requested columns and push the filters down: the date
+range prunes whole partitions and URL / seller / status filters are checked
+against row-group statistics (files are sorted by catalog_link).
+
+    python -m project.services.snapshots --url <catalog_link> [--days 30]
+    python -m project.services.snapshots --seller "Samsung Tienda Oficial" [--days 30] [--csv out.csv]
+"""
+from project.settings.config import SNAPSHOT_DIR
+from project.services.prices import normalize_records
+from project.utils.logger import logger
+from datetime import datetime, timedelta
+import argparse, glob, os, shutil
+
+# ──────────────────────────────────────────────────────────────────────────────
+# PATHS / CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(__file__)
+SNAPSHOTS_DIR = SNAPSHOT_DIR or os.path.join(BASE_DIR, "../database/snapshots")
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 10_000
+HISTORY_COLUMNS = ["timestamp", "catalog_link", "competitor", "price_cents", "installments_count",
+                   "installment_cents", "interest_free", "currency", "status", "run_id"]
+
+def _schema():
+    """Column types of a snapshot; rows are coerced to it so every run scans as one dataset."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("catalog_link", pa.string()),
+        ("timestamp", pa.timestamp("s")),
+        ("status", pa.string()),
+        ("title", pa.string()),
+        ("competitor", pa.string()),
+        ("price", pa.string()),
+        ("price_in_installments", pa.string()),
+        ("price_cents", pa.int64()),
+        ("installments_count", pa.int16()),
+        ("installment_cents", pa.int64()),
+        ("interest_free", pa.bool_()),
+        ("currency", pa.string()),
+        ("image", pa.string()),
+        ("failure_reason", pa.string()),
+        ("retry_stage", pa.string()),
+        ("api_cost_total", pa.float64()),
+    ])
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("date", pa.string()), ("run_id", pa.string())]), flavor="hive")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def run_date(run_id):
+    """Partition date of a run: the day in its id (new_run_id), today for other ids."""
+    try:
+        return datetime.strptime(run_id[:8], "%Y%m%d").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return datetime.now().strftime("%Y-%m-%d")
+
+def partition_dir(root, run_id):
+    return os.path.join(root, f"date={run_date(run_id)}", f"run_id={run_id}")
+
+def _timestamp(value):
+    try:
+        return datetime.strptime(str(value)[:19], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return None
+
+def _cost(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def to_table(records):
+    """Merged records (load_scrap shape) -> pyarrow Table with the snapshot schema, sorted by URL."""
+    import pyarrow as pa
+
+    schema = _schema()
+    records = sorted(normalize_records(records), key=lambda r: r["catalog_link"])
+    columns = {}
+    for field in schema:
+        values = [r.get(field.name) for r in records]
+        if field.name == "timestamp":
+            values = [_timestamp(v) if v else None for v in values]
+        elif field.name == "api_cost_total":
+            values = [_cost(v) for v in values]
+        elif pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        columns[field.name] = pa.array(values, type=field.type)
+    return pa.table(columns, schema=schema)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE
+# ──────────────────────────────────────────────────────────────────────────────
+def write_snapshot(run_id, records, root=SNAPSHOTS_DIR):
+    """
+    Persist the merged records of a run as one Parquet file. A resumed run
+    replaces its previous snapshot. Returns the file path.
+    """
+    import pyarrow.parquet as pq
+
+    table = to_table(records)
+    for old in glob.glob(os.path.join(root, "date=*", f"run_id={run_id}")):
+        shutil.rmtree(old, ignore_errors=True)
+    folder = partition_dir(root, run_id)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, "part-0.parquet")
+    tmp = os.path.join(folder, ".part-0.parquet.tmp")   # dot-prefixed: skipped by dataset discovery
+    pq.write_table(table, tmp, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp, path)
+    logger.info(f"Snapshot {run_id}: {table.num_rows} rows, {os.path.getsize(path) / 1024:.0f} KB -> {path}")
+    return path
+
+def snapshot_runs(root=SNAPSHOTS_DIR):
+    """Run ids with a snapshot, oldest first."""
+    found = glob.glob(os.path.join(root, "date=*", "run_id=*", "part-0.parquet"))
+    return sorted(os.path.basename(os.path.dirname(p))[len("run_id="):] for p in found)
+
+def _isin(field, values):
+    import pyarrow.dataset as ds
+
+    values = [values] if isinstance(values, str) else list(values)
+    return ds.field(field) == values[0] if len(values) == 1 else ds.field(field).isin(values)
+
+def scan(columns=None, urls=None, sellers=None, statuses=None, run_ids=None, since=None, until=None,
+         root=SNAPSHOTS_DIR):
+    """
+    Snapshot rows matching every given filter, as a pyarrow Table with
+    `columns` (all by default). since / until are datetimes on the row
+    timestamp; they also prune date partitions.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if not snapshot_runs(root):
+        empty = _partitioning().schema
+        empty = pa.unify_schemas([_schema(), empty]).empty_table()
+        return empty.select(columns) if columns else empty
+
+    conditions = []
+    if since is not None:
+        conditions += [ds.field("date") >= since.strftime("%Y-%m-%d"), ds.field("timestamp") >= since]
+    if until is not None:
+        conditions += [ds.field("date") <= until.strftime("%Y-%m-%d"), ds.field("timestamp") <= until]
+    for field, values in (("catalog_link", urls), ("competitor", sellers), ("status", statuses),
+                          ("run_id", run_ids)):
+        if values:
+            conditions.append(_isin(field, values))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    dataset = ds.dataset(root, format="parquet", partitioning=_partitioning())
+    return dataset.to_table(columns=columns, filter=expression)
+
+def history(url=None, seller=None, days=30, columns=HISTORY_COLUMNS, root=SNAPSHOTS_DIR):
+    """Price history of a catalog link and/or seller over the last `days`, as a DataFrame by timestamp."""
+    since = datetime.now() - timedelta(days=days) if days else None
+    table = scan(columns, urls=url and [url], sellers=seller and [seller], since=since, root=root)
+    return table.to_pandas().sort_values(["timestamp", "catalog_link"], ignore_index=True)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--url", help="catalog_link")
+    ap.add_argument("--seller", help="competitor, exact name")
+    ap.add_argument("--days", type=int, default=30, help="0 = every snapshot")
+    ap.add_argument("--csv", help="write the result here instead of printing it")
+    ap.add_argument("--root", default=SNAPSHOTS_DIR)
+    args = ap.parse_args()
+    if not (args.url or args.seller):
+        ap.error("give --url and/or --seller")
+
+    df = history(args.url, args.seller, args.days, root=args.root)
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+        logger.info(f"{len(df)} rows -> {args.csv}")
+    else:
+        print(df.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from project.utils.logger import logger
+from collections import deque
+import asyncio, random, time
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────────
+HEALTHY_STATUS = ("successed", "discarded")
+HEALTHY_REASONS = ("not_found",)  # a definitive answer from the site, not congestion
+BACKOFF_FACTOR = 0.5   # multiplicative decrease
+WINDOW = 20            # recent outcomes used for the observed rates
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CORE: AIMD concurrency limiter
+# ──────────────────────────────────────────────────────────────────────────────
+class AdaptiveLimiter:
+    """
+    AIMD limiter for in-flight scrapes.
+    The limit grows by one slot per `limit` healthy completions while the
+    recent success rate and latency stay within bounds, and is halved when
+    failures (timeouts, shield pages, parse errors) exceed the tolerance.
+    Only one decrease is applied per congestion event: requests that were
+    already in flight when the limit was cut do not cut it again.
+    """
+
+    def __init__(self, start, minimum, maximum, target_latency, failure_tolerance,
+                 think_min=0.0, think_max=0.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(start, minimum), maximum))
+        self.target_latency = target_latency
+        self.failure_tolerance = failure_tolerance
+        self.think_min = think_min
+        self.think_max = think_max
+        self.in_flight = 0
+        self._outcomes = deque(maxlen=WINDOW)   # (healthy, latency)
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    # --- dispatch ---
+    async def acquire(self):
+        """Wait for a free slot; returns the start time to hand back to record()."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def record(self, started, status, reason=None):
+        """Record the outcome of a request started at `started` and adapt the limit."""
+        latency = time.monotonic() - started
+        async with self._cond:
+            healthy = status in HEALTHY_STATUS or reason in HEALTHY_REASONS
+            self._outcomes.append((healthy, latency))
+            self._adjust(started, healthy, latency)
+            self._cond.notify_all()
+
+    async def release(self):
+        """Free the slot taken by acquire()."""
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def think_time(self):
+        """Pause after a job, tunable through THINK_TIME_MIN/THINK_TIME_MAX."""
+        return random.uniform(self.think_min, self.think_max)
+
+    # --- control ---
+    def _adjust(self, started, healthy, latency):
+        previous = int(self.limit)
+        if not healthy or latency > self.target_latency:
+            congested = self.failure_rate > self.failure_tolerance or latency > self.target_latency
+            if congested and started >= self._last_decrease:
+                self.limit = max(self.minimum, self.limit * BACKOFF_FACTOR)
+                self._last_decrease = time.monotonic()
+        elif self.failure_rate <= self.failure_tolerance and self.limit < self.maximum:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        if int(self.limit) != previous:
+            logger.info(f"Concurrency {previous} -> {int(self.limit)} "
+                        f"(failure rate {self.failure_rate:.0%}, avg latency {self.avg_latency:.1f}s)")
+
+    # --- observed rates ---
+    @property
+    def failure_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    @property
+    def avg_latency(self):
+        if not self._outcomes:
+            return 0.0
+        return sum(lat for _, lat in self._outcomes) / len(self._outcomes)
+
+    def snapshot(self):
+        """Current limit and rates over the last WINDOW completions."""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "success_rate": round(1 - self.failure_rate, 3),
+            "failure_rate": round(self.failure_rate, 3),
+            "avg_latency": round(self.avg_latency, 2),
+        }
@@ -1,8 +1,19 @@
-import threading
-from project.services.pipeline_scrapping import scrapping
-from project.settings.config import SECRET_GUIAS
+from project.settings.config import SECRET_GUIAS, JOB_POLICY, METRICS_TOKEN
+from project.services.jobs import JobManager
+from project.services.shards import parse_shard, parse_shard_count, dispatch
+from project.services.result_store import new_run_id
+from project.services.metrics import exposition
 from flask import Blueprint, request, Response, jsonify
 from project.utils.logger import logger
+import hmac
+
+def run_scrapping(resume=False, workdir=None, on_progress=None, shard=None, run_id=None):
+    # The scraping stack (scrapfly, DB, parser) is imported here, when a job
+    # actually runs, so the web process starts with Flask and config only.
+    from project.services.pipeline_scrapping import scrapping
+    scrapping(resume, workdir, on_progress, shard, run_id)
+
+job_manager = JobManager(run_scrapping, policy=JOB_POLICY)
 
 # BLUEPRINT CREATION
 scrapping_event = Blueprint("scrapping_init", __name__, url_prefix="/webhooks/start_scrapping")
@@ -11,12 +22,58 @@ def main():
     response = request.json
     if SECRET_GUIAS != response['secret']:
         return Response(status=401)
-    logger.info("Receving notification from App Import - Dispatching thread")
+    logger.info("Receving notification from App Import - Dispatching job")
+
+    # "shards": n reparte el run en n jobs (uno por shard) con un run_id comun;
+    # "shard": "k/n" + "run_id": un shard de un run repartido
+    try:
+        shards = parse_shard_count(response.get("shards"))
+        shard = parse_shard(response.get("shard"))
+    except ValueError as e:
+        return jsonify({"status": "invalid", "message": str(e)}), 400
+    if shards > 1:
+        run_id = new_run_id()
+        dispatched = dispatch(run_id, shards, job_manager.submit)
+        if not all(d["ok"] for d in dispatched):
+            # sin todos los shards el run nunca se mergea
+            return jsonify({"status": "failed", "message": "Not every shard could be started",
+                            "run_id": run_id, "shards": dispatched}), 502
+        return jsonify({"status": "dispatched", "run_id": run_id, "shards": dispatched}), 202
+
+    run_id = response.get("run_id")
+    if shard is not None and not run_id:
+        return jsonify({"status": "invalid", "message": "a shard needs the run_id shared by the run"}), 400
 
-    # 1. Creamos y lanzamos el hilo con la lógica pesada
-    # Pasamos una copia de los datos para evitar problemas de contexto
-    thread = threading.Thread(target=scrapping, args=())
-    thread.start()
+    # 1. Encolamos el job (uno a la vez); "resume": true continua el ultimo run fallido
+    job, accepted = job_manager.submit(resume=bool(response.get("resume", False)), shard=shard,
+                                       run_id=run_id if shard is not None else None)
+    if not accepted and job_manager.policy == "reject":
+        return jsonify({"status": "rejected", "message": "A scraping job is already active", "job": job.to_dict()}), 409
     # 2. Respondemos de inmediato
     # 202 significa "Accepted" (aceptado para procesamiento, pero no completado aún)
-    return jsonify({"status": "accepted", "message": "Task dispatched to background"}), 202
\ No newline at end of file
+    status = "accepted" if accepted else "coalesced"
+    return jsonify({"status": status, "message": "Task dispatched to background", "job": job.to_dict()}), 202
+
+@scrapping_event.route("/jobs", methods=["GET"], strict_slashes=False)
+@scrapping_event.route("/jobs/<job_id>", methods=["GET"])
+def status(job_id=None):
+    if SECRET_GUIAS != request.headers.get("X-Secret"):
+        return Response(status=401)
+    if job_id is None:
+        return jsonify({"jobs": [j.to_dict() for j in job_manager.recent()]}), 200
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "not_found", "job_id": job_id}), 404
+    return jsonify({"job": job.to_dict()}), 200
+
+# METRICS: totals of every run served by this process, Prometheus text format.
+# Auth is the standard "Authorization: Bearer <METRICS_TOKEN>", what a
+# Prometheus scrape_config sends with authorization: {credentials: ...}
+metrics_event = Blueprint("metrics", __name__)
+@metrics_event.route("/metrics", methods=["GET"])
+def metrics():
+    if not METRICS_TOKEN:
+        return Response(status=404)
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return Response(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(exposition(), mimetype="text/plain; version=0.0.4")
@@ -8,10 +8,55 @@ INSTANCE_DB=os.getenv("INSTANCE_DB")
 USER_DB=os.getenv("USER_DB")
 PASSWORD_DB=os.getenv("PASSWORD_DB")
 NAME_DB=os.getenv("NAME_DB")
+DB_POOL_SIZE=int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW=int(os.getenv("DB_MAX_OVERFLOW", "2"))
+DB_POOL_RECYCLE=int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT=int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_REFRESH_STRATEGY=os.getenv("DB_REFRESH_STRATEGY", "lazy")  # lazy suits Cloud Run's throttled CPU
+URL_PAGE_SIZE=int(os.getenv("URL_PAGE_SIZE", "2000"))  # catalog links per keyset page (db_manager.iter_urls)
 
 MELI_SCHMA=os.getenv("MELI_SCHMA")
+LOAD_MODE=os.getenv("LOAD_MODE", "upsert")  # upsert | truncate
 
 TOKEN_WHAPI=os.getenv("TOKEN_WHAPI")
 PHONE=os.getenv("PHONE")
 
-SECRET_GUIAS=os.getenv("SECRET_GUIAS")
\ No newline at end of file
+SECRET_GUIAS=os.getenv("SECRET_GUIAS")
+JOB_POLICY=os.getenv("JOB_POLICY", "coalesce")  # coalesce | queue | reject
+METRICS_TOKEN=os.getenv("METRICS_TOKEN")  # bearer token of /metrics (Prometheus authorization.credentials); unset: /metrics is off
+
+RESCUE_CONCURRENCY=int(os.getenv("RESCUE_CONCURRENCY", "3"))
+
+SCRAPE_CONCURRENCY_START=int(os.getenv("SCRAPE_CONCURRENCY_START", "5"))
+SCRAPE_CONCURRENCY_MIN=int(os.getenv("SCRAPE_CONCURRENCY_MIN", "1"))
+SCRAPE_CONCURRENCY_MAX=int(os.getenv("SCRAPE_CONCURRENCY_MAX", "12"))
+SCRAPE_TARGET_LATENCY=float(os.getenv("SCRAPE_TARGET_LATENCY", "60"))
+SCRAPE_FAILURE_TOLERANCE=float(os.getenv("SCRAPE_FAILURE_TOLERANCE", "0.2"))
+THINK_TIME_MIN=float(os.getenv("THINK_TIME_MIN", "1.5"))
+THINK_TIME_MAX=float(os.getenv("THINK_TIME_MAX", "3.5"))
+TIER_DECAY_HOURS=float(os.getenv("TIER_DECAY_HOURS", "72"))  # a learned fetch tier drops one stage per period
+PIPELINE_ARTIFACTS=os.getenv("PIPELINE_ARTIFACTS", "1") == "1"  # also write merged_results.json next to the run file
+# circuit breaker: pause dispatch when shield/captcha/timeout outcomes go over the threshold
+BREAKER_THRESHOLD=float(os.getenv("BREAKER_THRESHOLD", "0.5"))
+BREAKER_WINDOW=int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_SAMPLES=int(os.getenv("BREAKER_MIN_SAMPLES", "8"))
+BREAKER_COOLDOWN=float(os.getenv("BREAKER_COOLDOWN", "120"))  # seconds, doubled on each consecutive trip
+BREAKER_MAX_TRIPS=int(os.getenv("BREAKER_MAX_TRIPS", "3"))  # give up on the run after this many (0 = never)
+# credit planner: credits kept aside and the assumed cost of a stage with no history
+CREDIT_RESERVE=float(os.getenv("CREDIT_RESERVE", "0"))
+CREDIT_DEFAULT_COST=float(os.getenv("CREDIT_DEFAULT_COST", "30"))
+# scheduler: scrape only the URLs due, volatile ones more often
+SCHEDULE_ENABLED=os.getenv("SCHEDULE_ENABLED", "1") == "1"
+SCHEDULE_MIN_AGE_HOURS=float(os.getenv("SCHEDULE_MIN_AGE_HOURS", "0"))
+SCHEDULE_MAX_AGE_HOURS=float(os.getenv("SCHEDULE_MAX_AGE_HOURS", "20"))  # freshness bound: every URL at least once per daily trigger (minus the run time)
+SCHEDULE_HISTORY_DAYS=int(os.getenv("SCHEDULE_HISTORY_DAYS", "30"))
+# raw HTML archive (see services/reparse.py): off by default, keeps the last N runs
+HTML_ARCHIVE=os.getenv("HTML_ARCHIVE", "0") == "1"
+HTML_ARCHIVE_KEEP_RUNS=int(os.getenv("HTML_ARCHIVE_KEEP_RUNS", "5"))
+SCRAPFLY_FAKE=os.getenv("SCRAPFLY_FAKE", "")  # a fixtures dir (e.g. benchmarks/fixtures/pdp): serve recorded pages instead of calling Scrapfly
+# Parquet snapshot of every merged run (services/snapshots.py); SNAPSHOT_DIR defaults to project/database/snapshots
+SNAPSHOTS=os.getenv("SNAPSHOTS", "1") == "1"
+SNAPSHOT_DIR=os.getenv("SNAPSHOT_DIR", "")
+# horizontal sharding (services/shards.py): SHARD_DIR must be storage every worker instance sees
+SHARD_DIR=os.getenv("SHARD_DIR", "")
+SHARD_WORKER_URL=os.getenv("SHARD_WORKER_URL", "")  # start_scrapping endpoint a fan-out posts shard jobs to; empty = queue them here
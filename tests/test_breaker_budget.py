@@ -0,0 +1,52 @@
+"""
+Regression: a request refused by the credit ledger while the circuit breaker
+is half-open used to keep the breaker's only probe, so every other worker
+waited in breaker.wait() forever and the run never finished.
+
+    python -m pytest -q tests
+"""
+import asyncio, logging, os, sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("THINK_TIME_MIN", "0")
+os.environ.setdefault("THINK_TIME_MAX", "0")
+
+from project.services.blocking import CircuitBreaker
+from project.services.credit_plan import plan_credits, CreditLedger
+from project.services.fake_scrapfly import FakeScrapflyClient
+from project.services.first_scrapp import scrape_all
+from project.services.result_store import NdjsonWriter
+from project.services.run_context import RunContext
+from project.services.scrapfly_client import use_client
+from project.services.second_scrapp import scrape_one
+
+URLS = [f"https://articulo.mercadolibre.com.ar/MLA-{1400000000 + i}-producto-_JM" for i in range(20)]
+TIMEOUT_S = 10
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "pdp")
+
+def half_open_run(run_id):
+    """RunContext with no credits left and a breaker whose cooldown is over."""
+    logging.disable(logging.CRITICAL)
+    use_client(FakeScrapflyClient(FIXTURES_DIR, latency_s=0))
+    ledger = CreditLedger(plan_credits(URLS, {}, 0, rows=[]))
+    ctx = RunContext(run_id, {}, ledger)
+    ctx.breaker = CircuitBreaker(cooldown=0)
+    ctx.breaker.state = "open"      # _open_until already passed: the next wait() hands out the probe
+    return ctx
+
+def test_first_pass_budget_refusal_during_half_open(tmp_path):
+    with NdjsonWriter(str(tmp_path / "scrap_results.ndjson")) as writer, half_open_run("first") as ctx:
+        counts = asyncio.run(asyncio.wait_for(scrape_all(ctx, URLS, writer), TIMEOUT_S))
+        assert counts == {"failed": len(URLS)}
+        assert ctx.stage_counts("first_pass", ctx.reasons) == {"budget": len(URLS)}
+        assert not ctx.breaker._probing
+
+def test_rescue_budget_refusal_during_half_open():
+    rows = []
+    with half_open_run("rescue") as ctx:
+        async def rescue_all():
+            await asyncio.gather(*(scrape_one(ctx, url, rows.append) for url in URLS))
+        asyncio.run(asyncio.wait_for(rescue_all(), TIMEOUT_S))
+        assert [row["failure_reason"] for row in rows] == ["budget"] * len(URLS)
+        assert not ctx.breaker._probing
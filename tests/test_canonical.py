@@ -0,0 +1,61 @@
+"""
+Catalog link dedup: item ids, canonical URLs, and the fan-out of one
+scraped record back to every catalog link of its item.
+
+    python -m pytest -q tests
+"""
+import os, sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from project.services.canonical import item_id, canonical_url, dedupe, fan_out, covers, saved_requests
+
+ITEM = "https://articulo.mercadolibre.com.ar/MLA-1400000001-producto-_JM"
+
+@pytest.mark.parametrize("url, expected", [
+    (ITEM, "MLA1400000001"),
+    ("https://articulo.mercadolibre.com.ar/mla-1400000001-producto-_JM#reviews", "MLA1400000001"),
+    ("https://www.mercadolibre.com.ar/producto/p/MLA12345678?pdp_filters=item_id:MLA1", "MLA12345678"),
+    ("https://www.mercadolibre.com.ar/producto/up/MLAU987654321", "MLAU987654321"),
+    ("https://www.mercadolibre.com.ar/ofertas", None),
+])
+def test_item_id(url, expected):
+    assert item_id(url) == expected
+
+@pytest.mark.parametrize("url, expected", [
+    (ITEM + "?tracking_id=abc&variation=1", ITEM),
+    (ITEM + "#polycard", ITEM),
+    ("  HTTPS://Articulo.MercadoLibre.com.ar/MLA-1400000001-producto-_JM/  ", ITEM),
+    ("//articulo.mercadolibre.com.ar/MLA-1400000001-producto-_JM", ITEM),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+def test_dedupe_groups_links_of_the_same_item():
+    links = [
+        ITEM + "?tracking_id=a",
+        "https://articulo.mercadolibre.com.ar/MLA-1400000002-otro-_JM",
+        ITEM + "?tracking_id=b",
+        "https://articulo.mercadolibre.com.ar/MLA1400000001-slug-distinto-_JM",
+    ]
+    targets, groups = dedupe(links)
+    assert targets == [ITEM, "https://articulo.mercadolibre.com.ar/MLA-1400000002-otro-_JM"]
+    assert groups[ITEM] == [links[0], links[2], links[3]]
+    assert saved_requests(groups) == 2
+
+def test_fan_out_reaches_every_original_link():
+    links = [ITEM + "?a=1", ITEM + "?a=2", "https://articulo.mercadolibre.com.ar/MLA-1400000002-otro-_JM"]
+    targets, groups = dedupe(links)
+    records = [{"catalog_link": target, "price": "1.000"} for target in targets]
+    out = fan_out(records, groups)
+    assert sorted(r["catalog_link"] for r in out) == sorted(links)
+    assert all(r["price"] == "1.000" for r in out)
+    assert covers(out, groups)
+    assert not covers(out[:1], groups)
+
+def test_fan_out_keeps_records_outside_the_groups():
+    record = {"catalog_link": "https://articulo.mercadolibre.com.ar/MLA-1400000003-x-_JM"}
+    assert fan_out([record], {}) == [record]
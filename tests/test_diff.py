@@ -0,0 +1,68 @@
+"""
+Change detection: what classify() calls a change between the stored row and
+the new record, and what diff() hands to the loader and the notification.
+
+    python -m pytest -q tests
+"""
+import os, sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from project.services.diff import classify, diff, fingerprint, Changeset
+
+LINK = "https://articulo.mercadolibre.com.ar/MLA-1400000001-producto-_JM"
+
+def row(price_cents=100000, competitor="tienda", status="successed", **extra):
+    return {"catalog_link": LINK, "price_cents": price_cents, "competitor": competitor, "status": status, **extra}
+
+@pytest.mark.parametrize("old, new, kinds", [
+    (None, row(), ["new"]),
+    (row(), row(price_cents=120000), ["price_up"]),
+    (row(), row(price_cents=90000), ["price_down"]),
+    (row(), row(competitor="otra tienda"), ["seller_change"]),
+    (row(), row(price_cents=90000, competitor="otra tienda"), ["price_down", "seller_change"]),
+    (row(), row(price_cents=None, status="discarded"), ["unavailable"]),
+    (row(price_cents=None, status="discarded"), row(), ["recovered"]),
+    (row(price_cents=None, status="failed"), row(), ["recovered"]),
+    (row(), row(price_cents=None, status="failed"), ["failed"]),
+    (row(), row(), []),
+])
+def test_classify(old, new, kinds):
+    assert classify(old, new) == kinds
+
+def test_changeset_add_splits_new_and_changed():
+    changes = Changeset()
+    changes.add(row(title="Producto"), None)
+    changes.add(row(price_cents=120000), row())
+    assert [r["price_cents"] for r in changes.new] == [100000]
+    assert [r["price_cents"] for r in changes.changed] == [120000]
+    assert changes.rows() == changes.new + changes.changed
+    assert changes.counts() == {"new": 1, "price_up": 1}
+    up = changes.changes[1]
+    assert (up["old_price_cents"], up["new_price_cents"]) == (100000, 120000)
+    assert [c["catalog_link"] for c in changes.moves()] == [LINK]
+
+def test_diff_skips_an_unchanged_fingerprint():
+    record = row(timestamp="2026-10-17 12:00:00")
+    lookups = []
+    changes = diff([record], index={LINK: fingerprint(row())}, lookup=lambda links: lookups.append(links) or {})
+    assert record["fingerprint"] == fingerprint(row())
+    assert (changes.unchanged, len(changes), lookups) == (1, 0, [])
+    assert changes.seen == {LINK: "2026-10-17 12:00:00"}
+
+def test_diff_checks_a_changed_fingerprint_against_the_stored_row():
+    changes = diff([row(price_cents=90000)], index={LINK: fingerprint(row())}, lookup=lambda links: {LINK: row()})
+    assert changes.changed and changes.counts() == {"price_down": 1}
+
+def test_diff_backfills_rows_stored_without_a_fingerprint():
+    stored = {LINK: {"price": "1.000", "price_cents": None, "competitor": "tienda", "status": "successed"}}
+    changes = diff([row()], index={}, lookup=lambda links: stored)
+    assert (changes.unchanged, len(changes)) == (1, 0)
+    assert changes.missing == {LINK: fingerprint(row())}
+
+def test_diff_new_link():
+    changes = diff([row()], index={}, lookup=lambda links: {})
+    assert changes.new and changes.counts() == {"new": 1}
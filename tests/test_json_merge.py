@@ -0,0 +1,60 @@
+"""
+ScrapMerger: one record per URL out of the first pass and rescue rows.
+
+    python -m pytest -q tests
+"""
+import os, sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from project.services.json_merge import ScrapMerger
+
+URL = "https://articulo.mercadolibre.com.ar/MLA-1400000001-producto-_JM"
+
+def merge(rows):
+    merger = ScrapMerger()
+    for row in rows:
+        merger.add(row)
+    return merger
+
+def test_latest_non_null_value_wins():
+    merger = merge([
+        {"_url": URL, "_timestamp": "2026-10-17 10:00:00", "_status": "failed", "price": None, "title": "Viejo"},
+        {"_url": URL, "_timestamp": "2026-10-17 11:00:00", "_status": "successed", "price": "1.000", "title": None},
+    ])
+    assert len(merger) == 1
+    record = merger.record(URL)
+    assert (record["status"], record["price"], record["title"]) == ("successed", "1.000", "Viejo")
+    assert (record["catalog_link"], record["timestamp"]) == (URL, "2026-10-17 11:00:00")
+
+def test_an_older_row_only_fills_missing_fields():
+    merger = merge([
+        {"_url": URL, "_timestamp": "2026-10-17 11:00:00", "_status": "successed", "price": "1.000"},
+        {"_url": URL, "_timestamp": "2026-10-17 10:00:00", "_status": "failed", "price": "900", "seller": "tienda"},
+    ])
+    record = merger.record(URL)
+    assert (record["status"], record["price"], record["seller"]) == ("successed", "1.000", "tienda")
+
+def test_api_cost_is_summed():
+    merger = merge([
+        {"_url": URL, "_timestamp": "2026-10-17 10:00:00", "_api_cost": 30},
+        {"_url": URL, "_timestamp": "2026-10-17 11:00:00", "_api_cost": "25"},
+        {"_url": URL, "_timestamp": "2026-10-17 12:00:00", "_api_cost": float("nan")},
+        {"_url": URL, "_timestamp": "2026-10-17 13:00:00"},
+    ])
+    assert merger.rows == 4
+    assert merger.record(URL)["api_cost_total"] == 55
+
+def test_rows_never_sent_are_left_out():
+    merger = merge([
+        {"_url": URL, "_timestamp": "2026-10-17 10:00:00", "_status": "successed", "price": "1.000"},
+        {"_url": URL, "_timestamp": "2026-10-17 11:00:00", "_status": "failed", "failure_reason": "budget"},
+        {"_url": URL + "?x", "_timestamp": "2026-10-17 11:00:00", "_status": "deferred"},
+    ])
+    assert (merger.rows, merger.not_sent, len(merger)) == (1, 2, 1)
+    assert merger.record(URL)["status"] == "successed"
+
+def test_records_are_sorted_by_url():
+    merger = merge([{"_url": "https://b"}, {"_url": "https://a"}])
+    assert [r["catalog_link"] for r in merger.records()] == ["https://a", "https://b"]
@@ -0,0 +1,73 @@
+"""
+Typed prices: the price and installment strings of the PDP, parsed by the
+per-row (normalize_row) and the batch (normalize_records) normalizers.
+
+    python -m pytest -q tests
+"""
+import os, sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from project.services.prices import parse_price, parse_installments, normalize_row, normalize_records, PRICE_FIELDS
+
+PRICES = [
+    ("599.999", 59999900),
+    ("1.299,50", 129950),
+    ("1.234.567", 123456700),
+    ("850", 85000),
+    ("99,9", 9990),
+    ("", None),
+    (None, None),
+]
+
+# text -> (installments_count, installment_cents, interest_free)
+INSTALLMENTS = [
+    ("Mismo precio en 12 cuotas de $49.999", (12, 4999900, True)),
+    ("12x $ 4.999,50 sin interés", (12, 499950, True)),
+    ("6 cuotas de $ 20.000 sin interes", (6, 2000000, True)),
+    ("6 cuotas de $ 20.000 con 0% interés", (6, 2000000, True)),
+    ("3 cuotas de $ 1.000 con 0 % de interés", (3, 100000, True)),
+    ("3 cuotas de $ 1.000 con interés", (3, 100000, False)),
+    ("6 cuotas de $ 1.000 con 10% interés", (6, 100000, False)),
+    ("12 cuotas de US$ 100,5", (12, 10050, False)),
+    ("hasta 6 cuotas", (None, None, None)),
+    ("", (None, None, None)),
+    (None, (None, None, None)),
+]
+
+# (price, installments, symbol) -> currency
+CURRENCIES = [
+    (("1.000", None, "$"), "ARS"),
+    (("1.000", None, "US$"), "USD"),
+    (("1.000", None, "U$S"), "USD"),
+    (("1.000", "12 cuotas de US$ 100", None), "USD"),
+    (("1.000", "12 cuotas de $ 100", None), "ARS"),
+    ((None, None, "US$"), None),
+]
+
+@pytest.mark.parametrize("text, cents", PRICES)
+def test_parse_price(text, cents):
+    assert parse_price(text) == cents
+
+@pytest.mark.parametrize("text, plan", INSTALLMENTS)
+def test_parse_installments(text, plan):
+    assert parse_installments(text) == plan
+
+@pytest.mark.parametrize("row, currency", CURRENCIES)
+def test_currency(row, currency):
+    assert normalize_row(*row)["currency"] == currency
+
+def test_batch_matches_rows():
+    rows = [(price, text, None) for price, _ in PRICES for text, _ in INSTALLMENTS]
+    batch = normalize_records([{"price": price, "price_in_installments": text} for price, text, _ in rows])
+    for (price, text, symbol), record in zip(rows, batch):
+        assert {f: record[f] for f in PRICE_FIELDS} == normalize_row(price, text, symbol), (price, text)
+
+def test_batch_keeps_the_extractor_currency():
+    records = [{"price": "1.000", "price_in_installments": None, "currency": "USD"},
+               {"price": "1.000", "price_in_installments": None, "currency": None},
+               {"price": None, "price_in_installments": None, "currency": "USD"}]
+    assert [r["currency"] for r in normalize_records(records)] == ["USD", "ARS", None]
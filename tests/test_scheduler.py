@@ -0,0 +1,39 @@
+"""
+The scheduler right after rollout (rows loaded, history still empty) and
+once the history covers its window.
+
+    python -m pytest -q tests
+"""
+import os, sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from project.services.scheduler import interval_hours, rank
+
+NOW = datetime(2026, 10, 17, 12)
+URLS = [f"https://articulo.mercadolibre.com.ar/MLA-{1400000000 + i}-producto-_JM" for i in range(5)]
+
+def stats(first_seen=None, changes=0, discarded=0, hours_ago=24):
+    return {url: {"changes": changes, "discarded": discarded, "first_seen": first_seen,
+                  "last_scraped": NOW - timedelta(hours=hours_ago)} for url in URLS}
+
+def due(stats):
+    scores = rank(URLS, {}, stats, now=NOW.timestamp())
+    return [url for url in URLS if scores[url] >= 1]
+
+def test_rows_without_history_are_due():
+    assert due(stats()) == URLS
+
+def test_young_history_without_changes_is_due():
+    assert due(stats(first_seen=NOW - timedelta(days=3), hours_ago=2)) == URLS
+
+def test_stable_rows_are_scraped_every_trigger():
+    covered = NOW - timedelta(days=40)
+    assert due(stats(first_seen=covered, hours_ago=21)) == URLS
+    assert due(stats(first_seen=covered, hours_ago=2)) == []
+
+def test_volatile_rows_get_a_shorter_interval():
+    stat = {"changes": 60, "discarded": 0, "first_seen": NOW - timedelta(days=40)}
+    assert interval_hours(stat, NOW.timestamp(), min_hours=0, max_hours=20) == 6